@@ -3,79 +3,385 @@ import numpy as np
 from yolov5_utils import *
 import cv2
 import numpy as np
+import os
+import threading
+import time
+from queue import Queue, Empty
 import onnxruntime
 import torch
 
 
 class Yolov5OnnxruntimeDet(object):
-    def __init__(self, weights='./weights/yolov5s.onnx', names=None):
-        self.names = names
+    def __init__(self, weights='./weights/yolov5s.onnx', names=None, warmup_shape=(640, 640, 3)):
         if names is None:
             self.load_labels('./weights/class_names.txt')
+        else:
+            self._set_names(names)
         self.img_size = (640, 640)  # 训练权重的传入尺寸
+        self._letterbox_buf = np.empty((*self.img_size, 3), dtype=np.uint8)  # 每帧复用的 letterbox 缓冲区
+        self._letterbox_cache = {}  # (原图高宽, device) -> 坐标还原用的 (gain, offset, upper)
+        self._lw = None  # 打开视频源时按帧尺寸算好的线宽
+        self._text_cache = {}  # (label, lw) -> getTextSize 的 (w, h)
+        self._last_show = 0
+        self._show_interval = 1 / 60  # 显示最高 60 Hz，推理不受限
         cuda = torch.cuda.is_available()
         self.device = 'cuda' if cuda else 'cpu'  # 根据pytorch是否支持gpu选择设备
-        providers = ['CUDAExecutionProvider', 'CPUExecutionProvider'] if cuda else [
-            'CPUExecutionProvider']  # 选择onnxruntime
+        self.batch_size = 8  # start_video 每次送入模型的帧数，模型的 batch 维是动态的
+        providers = self._build_providers(weights, cuda)  # 选择onnxruntime
+        nms_weights = os.path.splitext(weights)[0] + '_nms.onnx'
+        int8_weights = os.path.splitext(weights)[0] + '.int8.onnx'
+        fp16_weights = os.path.splitext(weights)[0] + '.fp16.onnx'
+        if cuda and os.path.exists(nms_weights) and \
+                'TensorrtExecutionProvider' in onnxruntime.get_available_providers():
+            weights = nms_weights  # 图内融合了 EfficientNMS_TRT 的模型，NMS 直接在 TensorRT 中完成
+        elif cuda and os.path.exists(fp16_weights):
+            weights = fp16_weights  # 有gpu时优先使用 to_fp16() 生成的半精度模型
+        elif not cuda and os.path.exists(int8_weights):
+            weights = int8_weights  # 没有gpu时优先使用 quantize() 生成的 int8 模型
         print('load onnx weights...')
-        self.sess = onnxruntime.InferenceSession(weights, providers=providers)  # 加载模型
+        self.sess = self._create_session(weights, providers)  # 加载模型
         self.confidence = 0.45
         self.iou = 0.45
         self.output_name = self.sess.get_outputs()[0].name
         self.input_name = self.sess.get_inputs()[0].name
-        #warm up
-        self.inference_image(np.zeros((300,300,3), dtype=np.uint8))
+        self.input_dtype = np.float16 if self.sess.get_inputs()[0].type == 'tensor(float16)' else np.float32
+        # 带 NMS 的模型输出 num_dets, boxes, scores, classes
+        self.end2end = self.output_name == 'num_dets'
+        self._init_io_binding()
+        #warm up，用实际画面的尺寸跑 3 次，让 TensorRT/cuDNN 完成引擎构建和算法选择，letterbox 缓存也提前建好
+        for _ in range(3):
+            self.inference_image(np.zeros(warmup_shape, dtype=np.uint8))
+        # 空白帧没有检测结果，坐标还原的缓存单独建好
+        det_device = torch.device('cuda', 0) if self.ort_device == 'cuda' and not self.end2end else torch.device('cpu')
+        self._inverse_letterbox(warmup_shape, det_device)
         print('weights loaded!')
 
+    def _build_providers(self, weights, cuda):
+        if not cuda:
+            return ['CPUExecutionProvider']
+        providers = []
+        if 'TensorrtExecutionProvider' in onnxruntime.get_available_providers():
+            # TensorRT 优先，fp16 引擎缓存到权重目录下，之后启动可跳过数十秒的引擎构建
+            input_shape = 'images:{}x3x{}x{}'  # yolov5 导出的输入名为 images
+            min_shape = input_shape.format(1, *self.img_size)
+            max_shape = input_shape.format(self.batch_size, *self.img_size)
+            providers.append(('TensorrtExecutionProvider', {
+                'device_id': 0,
+                'trt_fp16_enable': '1',
+                'trt_engine_cache_enable': '1',
+                'trt_engine_cache_path': os.path.join(os.path.dirname(weights) or '.', 'trt_cache'),
+                'trt_max_workspace_size': str(2 << 30),
+                'trt_builder_optimization_level': '3',
+                # 输入尺寸固定为 640x640，batch 在 1~batch_size 之间，只构建一个引擎
+                'trt_profile_min_shapes': min_shape,
+                'trt_profile_opt_shapes': min_shape,
+                'trt_profile_max_shapes': max_shape,
+            }))
+        cuda_options = {
+            'device_id': 0,
+            'cudnn_conv_algo_search': 'DEFAULT',  # 默认的 EXHAUSTIVE 会在每个新形状上做耗时的卷积算法搜索
+            'do_copy_in_default_stream': '1',
+            'arena_extend_strategy': 'kNextPowerOfTwo',
+        }
+        if tuple(int(v) for v in onnxruntime.__version__.split('.')[:2]) >= (1, 20):
+            # 由 onnxruntime 在图内把卷积转换为 NHWC 布局，使 Tensor Core 生效，输入仍保持 NCHW
+            cuda_options['prefer_nhwc'] = '1'
+        providers += [('CUDAExecutionProvider', cuda_options), 'CPUExecutionProvider']
+        return providers
+
+    def _create_session(self, weights, providers):
+        '''
+        开启全部图优化，并把优化后的模型保存到磁盘，之后启动直接加载，跳过图优化
+        融合后的算子与执行设备相关，cpu/gpu 各存一份
+        '''
+        so = onnxruntime.SessionOptions()
+        so.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        so.enable_cpu_mem_arena = True
+        so.add_session_config_entry('session.use_env_allocators', '1')
+        opt_weights = os.path.splitext(weights)[0] + '.{}.opt.onnx'.format(self.device)
+        if os.path.exists(opt_weights) and os.path.getmtime(opt_weights) >= os.path.getmtime(weights):
+            so.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+            return onnxruntime.InferenceSession(opt_weights, sess_options=so, providers=providers)
+        so.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # TensorRT 接管的子图无法序列化，由它自己的引擎缓存负责加速启动
+        if 'TensorrtExecutionProvider' not in [p if isinstance(p, str) else p[0] for p in providers]:
+            so.optimized_model_filepath = opt_weights
+        return onnxruntime.InferenceSession(weights, sess_options=so, providers=providers)
+
+    def _init_io_binding(self):
+        # IOBinding：输入输出绑定到持久的 OrtValue，每帧只更新数据，不再重复分配和拷贝
+        self.io_binding = self.sess.io_binding()
+        self._batch_bindings = {}  # inference_batch 使用，按 batch 大小缓存
+        gpu_providers = {'TensorrtExecutionProvider', 'CUDAExecutionProvider'}
+        self.ort_device = 'cuda' if gpu_providers & set(self.sess.get_providers()) else 'cpu'
+        input_shape = (1, 3, *self.img_size)
+        self._blob = self._bind_input(self.io_binding, input_shape)  # 每帧原地写入的预处理结果
+        if self.end2end:
+            # NMS 后的输出很小，由 onnxruntime 分配在 cpu 上
+            for output in self.sess.get_outputs():
+                self.io_binding.bind_output(output.name)
+            self.output_ort = self._pred_onnx = None
+            return
+        # 固定输入尺寸下先跑一次，得到输出形状
+        out = self.sess.run([self.output_name], {self.input_name: np.zeros(input_shape, dtype=self.input_dtype)})[0]
+        self.output_dtype = out.dtype
+        self.output_ort = onnxruntime.OrtValue.ortvalue_from_shape_and_type(out.shape, out.dtype, self.ort_device, 0)
+        self.io_binding.bind_ortvalue_output(self.output_name, self.output_ort)
+        self._pred_onnx = self._alias_output(self.output_ort)
+
+    def _bind_input(self, io_binding, shape):
+        # cpu 上绑定与 numpy 数组共享内存的 OrtValue，gpu 上直接绑定 cuda tensor 的显存，都只绑定一次
+        if self.ort_device == 'cpu':
+            blob = np.empty(shape, dtype=self.input_dtype)
+            io_binding.bind_ortvalue_input(self.input_name, onnxruntime.OrtValue.ortvalue_from_numpy(blob))
+        else:
+            blob = torch.empty(shape, dtype=torch.float16 if self.input_dtype == np.float16 else torch.float32,
+                               device=self.device)
+            io_binding.bind_input(self.input_name, self.ort_device, 0, self.input_dtype, list(shape), blob.data_ptr())
+        return blob
+
+    @staticmethod
+    def preprocess(image, img_size, dtype=np.float32):
+        '''
+        letterbox 缩放填充、BGR 转 RGB、HWC 转 CHW、归一化，由 opencv 一次完成
+        Args:
+            image: opencv BGR 图像
+            img_size: 模型输入尺寸
+            dtype: 模型输入类型，半精度模型传 np.float16
+
+        Returns: (1,3,H,W) 的连续 blob
+        '''
+        if hasattr(cv2.dnn, 'blobFromImageWithParams'):  # opencv>=4.9 支持 letterbox 填充
+            params = cv2.dnn.Image2BlobParams()
+            params.scalefactor = (1 / 255.,) * 3
+            params.size = img_size[::-1]  # (w, h)
+            params.swapRB = True
+            params.paddingmode = cv2.dnn.DNN_PMODE_LETTERBOX
+            params.borderValue = (114, 114, 114)
+            return cv2.dnn.blobFromImageWithParams(image, params).astype(dtype, copy=False)
+        img = letterbox(image, img_size, stride=64, auto=False)[0]
+        return cv2.dnn.blobFromImage(img, scalefactor=1 / 255., swapRB=True).astype(dtype, copy=False)
+
+    def _preprocess_into(self, image, blob):
+        '''
+        与 preprocess 结果相同，但写入预先分配的缓冲区，每帧不再分配新数组
+        Args:
+            image: opencv BGR 图像
+            blob: (3,H,W) 的输出缓冲区
+        '''
+        letterbox_into(image, self._letterbox_buf)
+        # BGR 转 RGB、HWC 转 CHW 都是视图，和归一化一起在一次乘法中写入 blob
+        np.multiply(self._letterbox_buf[..., ::-1].transpose(2, 0, 1), np.float32(1 / 255.), out=blob,
+                    casting='unsafe')
+
+    def _preprocess_gpu(self, image, blob):
+        '''
+        gpu 上的预处理：只上传原始 uint8 帧，letterbox 缩放、BGR 转 RGB、HWC 转 CHW、归一化都在显存中完成
+        双线性插值由 torch 计算，结果与 opencv 的 INTER_LINEAR 有少量舍入差异
+        Args:
+            image: opencv BGR 图像
+            blob: (3,H,W) 的 cuda tensor
+        '''
+        h0, w0 = image.shape[:2]
+        h, w = self.img_size
+        r = min(h / h0, w / w0)
+        new_h, new_w = int(round(h0 * r)), int(round(w0 * r))
+        top, left = int(round((h - new_h) / 2 - 0.1)), int(round((w - new_w) / 2 - 0.1))
+        img = torch.from_numpy(image).to(self.device, non_blocking=True)
+        img = img.permute(2, 0, 1).flip(0).unsqueeze(0).float()
+        if (new_h, new_w) != (h0, w0):
+            img = torch.nn.functional.interpolate(img, size=(new_h, new_w), mode='bilinear', align_corners=False)
+        if (new_h, new_w) != (h, w):  # 宽高比与模型输入一致时没有边框
+            blob.fill_(114 / 255.)
+        blob[:, top:top + new_h, left:left + new_w] = img[0].div_(255.)
+
+    @staticmethod
+    def to_fp16(weights='./weights/yolov5s.onnx'):
+        '''
+        把 onnx 模型转为半精度（输入输出也是 fp16），保存为同目录下的 *.fp16.onnx
+        需要 pip install onnxconverter-common
+        Args:
+            weights: fp32 onnx 权重
+
+        Returns: fp16 权重路径
+        '''
+        import onnx
+        from onnxconverter_common import float16
+
+        model = onnx.load(weights)
+        # 原图中的 Cast 固定输出 float32，转换后类型对不上，保留为 fp32 由转换器在前后插入 Cast
+        casts = [node.name for node in model.graph.node if node.op_type == 'Cast']
+        model = float16.convert_float_to_float16(model, keep_io_types=False, node_block_list=casts)
+        fp16_weights = os.path.splitext(weights)[0] + '.fp16.onnx'
+        onnx.save(model, fp16_weights)
+        return fp16_weights
+
+    @classmethod
+    def quantize(cls, calib_images, weights='./weights/yolov5s.onnx', img_size=(640, 640)):
+        '''
+        用校准图像对 onnx 模型做 int8 静态量化，保存为同目录下的 *.int8.onnx
+        Args:
+            calib_images: 校准用的 opencv BGR 图像，建议从实际的摄像头/视频画面中抽取几十张
+            weights: fp32 onnx 权重
+            img_size: 模型输入尺寸
+
+        Returns: int8 权重路径
+        '''
+        from onnxruntime.quantization import quantize_static, CalibrationDataReader, QuantFormat, QuantType
+
+        input_name = onnxruntime.InferenceSession(weights, providers=['CPUExecutionProvider']).get_inputs()[0].name
+
+        class ImageDataReader(CalibrationDataReader):
+            def __init__(self):
+                self.data = ({input_name: cls.preprocess(img, img_size)} for img in calib_images)
+
+            def get_next(self):
+                return next(self.data, None)
+
+        int8_weights = os.path.splitext(weights)[0] + '.int8.onnx'
+        quantize_static(weights, int8_weights, ImageDataReader(), quant_format=QuantFormat.QDQ,
+                        activation_type=QuantType.QInt8, weight_type=QuantType.QInt8,
+                        op_types_to_quantize=['Conv'])
+        return int8_weights
+
+    @staticmethod
+    def read_labels(file):
+        with open(file, 'r', encoding='utf-8') as f:
+            return tuple(f.read().rstrip('\n').split('\n'))
+
     def load_labels(self, file):
-        with open(file, 'r') as f:
-            self.names = f.read().rstrip('\n').split('\n')
+        self._set_names(self.read_labels(file))
+
+    def _set_names(self, names):
+        # 类别名只读取一次；另存一份 object 数组，_det_to_results 按类别下标一次取出所有标签
+        self.names = tuple(names)
+        self._names_arr = np.array(self.names, dtype=object)
 
     def inference_image(self, image):
         # 预处理
-        img = letterbox(image, self.img_size, stride=64, auto=False)[0]
-        # 转tensor
-        img = img.transpose((2, 0, 1))[::-1]  # HWC 转 CHW，BGR 转 RGB
-        # 返回一个连续的array，其内存是连续的。
-        img = np.ascontiguousarray(img)
-        # 放入设备
-        img = torch.from_numpy(img).to(self.device)
-        # uint8 转 fp32
-        img = img.float()
-        # 归一化
-        img /= 255
-        # 扩大批量调暗
-        if len(img.shape):
-            img = img[None]
+        self._preprocess_frame(image, self._blob[0])
 
         # 推理
-        img = img.cpu().numpy()  # 传入cpu并转成numpy格式
-        pred_onnx = torch.tensor(self.sess.run([self.output_name], {self.input_name: img})[0])
-        # nms
-        pred = non_max_suppression(pred_onnx, self.confidence, self.iou, classes=None, agnostic=False, max_det=1000)
+        self._run(self.io_binding)
+        pred = self._get_pred(self.io_binding, self._pred_onnx)
 
         # 转换
         result_list = []
         for i, det in enumerate(pred):
             if len(det):
-                # 将坐标 (xyxy) 从 img_shape 重新缩放为 img0_shape
-                det[:, :4] = scale_coords(img.shape[2:], det[:, :4], image.shape).round()
-                for *xyxy, conf, cls in reversed(det):  # 从末尾遍历
-                    # 将xyxy合并至一个维度,锚框的左上角和右下角
-                    xyxy = (torch.tensor(xyxy).view(1, 4)).view(-1)
-                    result_list.append(
-                        [self.names[int(cls)], round(float(conf), 2), int(xyxy[0]), int(xyxy[1]), int(xyxy[2]),
-                         int(xyxy[3])])
+                result_list.extend(self._det_to_results(det, image.shape))
 
         return result_list
+
+    def inference_batch(self, frames):
+        '''
+        多帧拼成一个 batch，只调用一次 onnxruntime，NMS 也对整个 batch 一次完成
+        Args:
+            frames: opencv BGR 图像列表，长度不超过 batch_size
+
+        Returns: 每帧一个 result_list，格式与 inference_image 相同
+        '''
+        blob, io_binding, pred_onnx = self._get_batch_binding(len(frames))
+        for i, frame in enumerate(frames):
+            self._preprocess_frame(frame, blob[i])
+        self._run(io_binding)
+        pred = self._get_pred(io_binding, pred_onnx)
+        return [self._det_to_results(det, frame.shape) if len(det) else [] for det, frame in zip(pred, frames)]
+
+    def _get_batch_binding(self, n):
+        # 每种 batch 大小第一次出现时创建持久的输入/输出缓冲区，之后复用
+        if n not in self._batch_bindings:
+            io_binding = self.sess.io_binding()
+            blob = self._bind_input(io_binding, (n, 3, *self.img_size))
+            pred_onnx = None
+            if self.end2end:
+                for output in self.sess.get_outputs():
+                    io_binding.bind_output(output.name)
+            else:
+                output_shape = (n, *self.output_ort.shape()[1:])
+                output_ort = onnxruntime.OrtValue.ortvalue_from_shape_and_type(output_shape, self.output_dtype,
+                                                                               self.ort_device, 0)
+                io_binding.bind_ortvalue_output(self.output_name, output_ort)
+                pred_onnx = self._alias_output(output_ort)
+            self._batch_bindings[n] = blob, io_binding, pred_onnx
+        return self._batch_bindings[n]
+
+    def _preprocess_frame(self, image, blob):
+        if self.ort_device == 'cpu':
+            self._preprocess_into(image, blob)
+        else:
+            self._preprocess_gpu(image, blob)
+
+    def _run(self, io_binding):
+        if self.ort_device != 'cpu':
+            # 预处理在 torch 的 stream 上，onnxruntime 读取输入前要等它完成
+            torch.cuda.current_stream().synchronize()
+        self.sess.run_with_iobinding(io_binding)
+
+    @staticmethod
+    def _alias_output(output_ort):
+        '''
+        经 DLPack 得到与输出 OrtValue 共享内存的 tensor，绑定时创建一次，之后每次推理后直接读取
+        gpu 上输出留在显存中，NMS 也在 GPU 上完成
+        '''
+        if hasattr(output_ort, '__dlpack__'):  # onnxruntime 较新版本的 OrtValue 直接支持 DLPack 协议
+            return torch.utils.dlpack.from_dlpack(output_ort)
+        if output_ort.device_name() == 'cpu':
+            return torch.from_numpy(output_ort.numpy())
+        return torch.utils.dlpack.from_dlpack(output_ort._ortvalue.to_dlpack())
+
+    def _get_pred(self, io_binding, pred_onnx):
+        if self.end2end:
+            return self._end2end_pred(io_binding)
+        # nms，半精度模型的输出先转回 fp32
+        return fast_nms(pred_onnx.float(), self.confidence, self.iou, classes=None, agnostic=False, max_det=1000)
+
+    def _det_to_results(self, det, image_shape):
+        # 将坐标 (xyxy) 从 img_shape 重新缩放为 img0_shape，与 scale_coords 计算相同，减填充、除比例、裁剪一次完成
+        gain, offset, upper = self._inverse_letterbox(image_shape, det.device)
+        det[:, :4] = torch.min((det[:, :4] - offset) / gain, upper).clamp_(min=0).round()
+        # 一次性转成 numpy 后按列切片，从末尾遍历
+        arr = det.cpu().numpy()[::-1]
+        xyxy = arr[:, :4].astype(np.int32).tolist()  # 锚框的左上角和右下角
+        confs = arr[:, 4].astype(np.float64).round(2).tolist()
+        labels = self._names_arr[arr[:, 5].astype(np.intp)].tolist()
+        return [[name, cf, x1, y1, x2, y2] for (x1, y1, x2, y2), cf, name in zip(xyxy, confs, labels)]
+
+    def _inverse_letterbox(self, image_shape, device):
+        # 同一视频源的帧尺寸不变，letterbox 的缩放比例和填充只计算一次
+        key = (image_shape[:2], device)
+        if key not in self._letterbox_cache:
+            h0, w0 = image_shape[:2]
+            gain = min(self.img_size[0] / h0, self.img_size[1] / w0)
+            pad_x, pad_y = (self.img_size[1] - w0 * gain) / 2, (self.img_size[0] - h0 * gain) / 2
+            offset = torch.tensor([pad_x, pad_y, pad_x, pad_y], device=device)
+            upper = torch.tensor([w0, h0, w0, h0], dtype=torch.float32, device=device)
+            self._letterbox_cache[key] = gain, offset, upper
+        return self._letterbox_cache[key]
+
+    def _end2end_pred(self, io_binding):
+        # 模型内已完成 NMS，这里只按置信度阈值过滤，整理成与 fast_nms 相同的 (n,6) [xyxy, conf, cls]
+        num_dets, boxes, scores, classes = io_binding.copy_outputs_to_cpu()
+        pred = []
+        for n, box, score, cls in zip(num_dets.reshape(-1), boxes, scores, classes):
+            det = np.concatenate((box[:n], score[:n, None], cls[:n, None]), 1).astype(np.float32)
+            pred.append(torch.from_numpy(det[det[:, 4] >= self.confidence]))
+        return pred
+
     def draw_image(self, result_list, opencv_img):
         if len(result_list) == 0:
             return opencv_img
+        lw = self._lw or self._line_width(*opencv_img.shape[:2])
         for result in result_list:
             label_text = result[0] + ',' + str(result[1])
-            opencv_img = self.__draw_image(opencv_img, [result[2], result[3], result[4], result[5]], label_text)
+            # cv2 原地绘制，不需要接收返回值
+            self.__draw_image(opencv_img, [result[2], result[3], result[4], result[5]], label_text, line_width=lw)
         return opencv_img
 
+    @staticmethod
+    def _line_width(height, width):
+        return max(round((height + width + 3) / 2 * 0.003), 2)  # 与 sum(img.shape) 的算法一致
+
     def __draw_image(self, opencv_img, box, label='', line_width=None, box_color=(255, 0, 0),
                      txt_box_color=(200, 200, 200),
                      txt_color=(255, 255, 255)):
@@ -97,7 +403,10 @@ class Yolov5OnnxruntimeDet(object):
         cv2.rectangle(opencv_img, p1, p2, box_color, thickness=lw, lineType=cv2.LINE_AA)
         if label:
             tf = max(lw - 1, 1)  # font thickness
-            w, h = cv2.getTextSize(label, 0, fontScale=lw / 3, thickness=tf)[0]  # text width, height
+            key = (label, lw)
+            if key not in self._text_cache:
+                self._text_cache[key] = cv2.getTextSize(label, 0, fontScale=lw / 3, thickness=tf)[0]
+            w, h = self._text_cache[key]  # text width, height
             outside = p1[1] - h - 3 >= 0  # label fits outside box
             p2 = p1[0] + w, p1[1] - h - 3 if outside else p1[1] + h + 3
             cv2.rectangle(opencv_img, p1, p2, txt_box_color, -1, cv2.LINE_AA)  # filled
@@ -112,24 +421,86 @@ class Yolov5OnnxruntimeDet(object):
         cv2.imshow('result', opencv_img)
         cv2.waitKey(0)
 
+    def _run_pipeline(self, cap, batch_size=1):
+        '''
+        读帧线程 → 主线程推理 → 显示线程 三级流水线，读帧解码和绘制显示与推理并行
+        队列长度有限，推理跟不上时读帧线程会阻塞等待，不会无限堆积
+        Args:
+            cap: 已打开的 cv2.VideoCapture，结束后释放
+            batch_size: 攒够多少帧推理一次，摄像头为 1 以保证实时性
+        '''
+        read_q = Queue(maxsize=max(4, batch_size * 2))
+        disp_q = Queue(maxsize=max(4, batch_size * 2))
+        stop = threading.Event()  # 按 q 或读帧结束时置位
+
+        def reader():
+            # 无论是读完、按 q 停止还是出错退出，都放入结束标志，主线程不会一直等在攒 batch 的 get 上
+            try:
+                while not stop.is_set():
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    read_q.put((True, frame))
+            finally:
+                read_q.put((False, None))
+
+        def display():
+            while True:
+                item = disp_q.get()
+                if item is None:
+                    break
+                now = time.perf_counter()
+                if now - self._last_show < self._show_interval:
+                    continue  # 超过显示刷新率的帧不绘制也不显示
+                self._last_show = now
+                frame, result_list = item
+                cv2.imshow('frame', self.draw_image(result_list, frame))
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    stop.set()
+            cv2.destroyAllWindows()
+
+        reader_th = threading.Thread(target=reader, daemon=True)
+        display_th = threading.Thread(target=display, daemon=True)
+        reader_th.start()
+        display_th.start()
+        ended = False
+        while not stop.is_set() and not ended:
+            frames = []
+            while len(frames) < batch_size:
+                ret, frame = read_q.get()
+                if not ret:
+                    ended = True
+                    break
+                frames.append(frame)
+            if not frames:
+                break
+            results = self.inference_batch(frames) if batch_size > 1 else [self.inference_image(frames[0])]
+            for frame, result_list in zip(frames, results):  # 按原顺序逐帧显示
+                disp_q.put((frame, result_list))
+        stop.set()
+        disp_q.put(None)
+        # 读帧线程可能阻塞在 put 上，取空队列让它退出
+        while reader_th.is_alive():
+            try:
+                read_q.get(timeout=0.1)
+            except Empty:
+                pass
+        display_th.join()
+        cap.release()
+
     def start_camera(self, camera_index=0):
         cap = cv2.VideoCapture(camera_index)
+        # 只缓存最新的 1 帧，避免推理跟不上时读到过时的画面；MJPG 降低 USB 带宽
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         frame_fps = int(cap.get(cv2.CAP_PROP_FPS))
         # 获取视频帧宽度和高度
         frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         print("video fps={},width={},height={}".format(frame_fps, frame_width, frame_height))
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            result_list = self.inference_image(frame)
-            result_img = self.draw_image(result_list, frame)
-            cv2.imshow('frame', result_img)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-        cap.release()
-        cv2.destroyAllWindows()
+        self._lw = self._line_width(frame_height, frame_width) if frame_width and frame_height else None
+        self._run_pipeline(cap)
+        self._lw = None
 
     def start_video(self, video_file):
         cap = cv2.VideoCapture(video_file)
@@ -138,22 +509,15 @@ class Yolov5OnnxruntimeDet(object):
         frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         print("video fps={},width={},height={}".format(frame_fps, frame_width, frame_height))
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            result_list = self.inference_image(frame)
-            result_img = self.draw_image(result_list, frame)
-            cv2.imshow('frame', result_img)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-        cap.release()
-        cv2.destroyAllWindows()
+        self._lw = self._line_width(frame_height, frame_width) if frame_width and frame_height else None
+        self._run_pipeline(cap, self.batch_size)
+        self._lw = None
 
 
 if __name__ == '__main__':
-    detector = Yolov5OnnxruntimeDet(weights=r'E:\ai\yolov5-6.0\pre-model\yolov5s.onnx')
-    detector.load_labels(r'E:\official-model\yolov8\labels.txt')
+    # 直接传入类别名，不再先读取默认的 class_names.txt 再覆盖
+    detector = Yolov5OnnxruntimeDet(weights=r'E:\ai\yolov5-6.0\pre-model\yolov5s.onnx',
+                                    names=Yolov5OnnxruntimeDet.read_labels(r'E:\official-model\yolov8\labels.txt'))
     # detector.start_video(r'D:\car.mp4')
     img = cv2.imread(r'E:\test.png')
     result_list = detector.inference_image(img)
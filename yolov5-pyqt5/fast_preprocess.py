@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+快速预处理模块
+letterbox 填充 + BGR转RGB + HWC转CHW + 归一化，直接写入预先分配的输入缓冲区
+安装了 numba 时使用 JIT 编译的并行内核，否则退回 numpy 实现
+"""
+import cv2
+import numpy as np
+from typing import Tuple
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def _pack_chw(resized, out, top, left, pad_value):
+        """把缩放后的 BGR 图像放到 out 的 (top, left) 处，其余位置填充 pad_value，同时完成通道翻转和归一化"""
+        h, w = resized.shape[0], resized.shape[1]
+        out_h, out_w = out.shape[1], out.shape[2]
+        for y in prange(out_h):
+            yy = y - top
+            for x in range(out_w):
+                xx = x - left
+                if 0 <= yy < h and 0 <= xx < w:
+                    for c in range(3):
+                        out[c, y, x] = resized[yy, xx, 2 - c] / 255.0
+                else:
+                    for c in range(3):
+                        out[c, y, x] = pad_value
+else:
+    def _pack_chw(resized, out, top, left, pad_value):
+        h, w = resized.shape[:2]
+        out[:] = pad_value
+        np.divide(resized.transpose((2, 0, 1))[::-1], 255, out=out[:, top:top + h, left:left + w], casting='unsafe')
+
+
+def preprocess_into(image: np.ndarray, out: np.ndarray, color: int = 114) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+    """
+    图像预处理，结果与 letterbox(auto=False) + 转置 + /255 相同
+
+    Args:
+        image: 输入图像 (BGR, HWC, uint8)
+        out: 输出缓冲区 (3, H, W) float32，目标尺寸取 out 的尺寸
+        color: 填充灰度值
+
+    Returns:
+        缩放比例, 填充大小
+    """
+    shape = image.shape[:2]
+    new_shape = out.shape[1:]
+    r = min(new_shape[0] / shape[0], new_shape[1] / shape[1])
+    new_unpad = int(round(shape[1] * r)), int(round(shape[0] * r))  # 宽高
+    dw, dh = (new_shape[1] - new_unpad[0]) / 2, (new_shape[0] - new_unpad[1]) / 2
+    # 缩放仍由 opencv 完成，插值结果与 letterbox 一致
+    if shape[::-1] != new_unpad:
+        image = cv2.resize(image, new_unpad, interpolation=cv2.INTER_LINEAR)
+    _pack_chw(image, out, int(round(dh - 0.1)), int(round(dw - 0.1)), np.float32(color / 255.0))
+    return (r, r), (dw, dh)
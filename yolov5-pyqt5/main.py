@@ -13,9 +13,11 @@
   6. 参数调节：置信度和 IOU 阈值的实时滑块调节
 
 多线程架构说明：
-  - 视频/摄像头的检测循环运行在 threading.Thread 子线程中，避免阻塞 GUI 主线程
-  - 子线程通过 pyqtSignal 信号机制向主线程发送数据，由主线程安全更新 UI 控件
-  - camera_open 标志位用于主线程和子线程之间的停止信号通信
+  - 视频/摄像头的检测循环运行在常驻的 CaptureWorker(QThread) 中，避免阻塞 GUI 主线程
+  - 读帧由独立的采集线程完成，通过有界队列交给检测循环，推理耗时不会拖慢采集
+  - 子线程通过 pyqtSignal 信号机制向主线程发送数据（文本、待显示的帧），由主线程安全更新 UI 控件
+  - camera_open 标志位用于主线程和子线程之间的停止信号通信，退出程序时用 requestInterruption + wait 等待线程结束
+  - 保存图像、导出 CSV/JSON/报告在单线程的 _io_pool 中执行，完成后通过 io_signal 在主线程弹出提示
 
 界面布局概览：
   ┌──────────────────────────────────────────────────────────┐
@@ -49,10 +51,13 @@
 
 # ---- 标准库导入 ----
 import os       # 文件路径操作、目录扫描
+# OpenMP、OpenBLAS 只在各自的库首次加载时读取线程数，必须在导入 numpy / cv2 / torch 之前设置；
+# 避免 OpenMP、OpenCV、ONNX Runtime 各自按核数开线程、每帧互相抢占 CPU
+os.environ.setdefault("OMP_NUM_THREADS", "1")
 import sys      # 命令行参数、程序退出
 # ---- PyQt5 GUI 框架 ----
 from PyQt5 import QtCore, QtGui, QtWidgets
-# QThread: Qt 线程类（本项目实际使用 threading.Thread，QThread 已导入但未使用）
+# QThread: Qt 线程类，CaptureWorker 用它运行摄像头/视频检测循环
 # pyqtSignal: Qt 信号类型定义（用于类级别信号声明）
 from PyQt5.QtCore import QThread, pyqtSignal
 # QImage: 将 numpy 图像数组转为 Qt 可显示的图像对象
@@ -68,10 +73,14 @@ from PyQt5.QtWidgets import QFileDialog, QLabel, QApplication, QMessageBox
 import image_rc
 # ---- 标准库/第三方库 ----
 import threading      # 多线程支持，用于在子线程中运行检测循环
+import queue          # 采集线程与检测循环之间的有界帧队列
 import cv2            # OpenCV，图像/视频读写、色彩转换、绘图
 import numpy as np    # numpy 数组操作
 import time           # 时间格式化（告警叠加层时间戳）、sleep（退出等待）
 from datetime import datetime  # 日期时间格式化（文件名生成）
+from collections import OrderedDict, Counter  # 检测器 LRU 缓存、类别计数
+from operator import itemgetter  # 取检测结果中的类别名
+from concurrent.futures import ThreadPoolExecutor  # 后台保存/导出文件
 # ---- 项目内部模块 ----
 # create_detector: 工厂函数，根据模型文件自动创建检测器实例
 # BaseDetector: 检测器抽象基类（类型提示用）
@@ -83,6 +92,24 @@ from video_processor import VideoProcessor, FrameRateController
 from post_processor import PostProcessor
 
 
+# =============================================================================
+# CaptureWorker - 摄像头/视频检测线程
+# =============================================================================
+# run() 中执行 Ui_MainWindow 的检测循环（start_camera / start_video），
+# 绘制好的帧通过 Ui_MainWindow.frame_signal 交给主线程显示，子线程不直接操作任何控件。
+# action / idle_text 记录启动它的工具栏按钮及其空闲时的文字，线程结束后由主线程恢复。
+class CaptureWorker(QThread):
+    def __init__(self, loop, *args, action=None, idle_text=''):
+        super().__init__()
+        self.loop = loop
+        self.args = args
+        self.action = action
+        self.idle_text = idle_text
+
+    def run(self):
+        self.loop(*self.args)
+
+
 # =============================================================================
 # Ui_MainWindow - 主窗口类
 # =============================================================================
@@ -95,6 +122,25 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
     # 参数2 (str): 标志位，'res' 表示更新结果文本框，其他值表示更新状态栏
     # PyQt5 要求信号必须在类级别定义，不能在 __init__ 中定义
     signal = QtCore.pyqtSignal(str, str)
+    # 模型下拉框列出的权重文件类型，以及不单独列出的派生模型文件
+    WEIGHTS_EXTS = {".onnx", ".pt"}
+    DERIVED_WEIGHTS_SUFFIXES = (".int8.onnx", ".fp16.onnx", ".opt.onnx", "_nms.onnx")
+    # 静止画面判定：缩小到 80x45 的灰度图与上一次推理的帧逐像素相减，
+    # 差值总和小于该阈值（平均每像素不到 2 个灰度级）时认为画面没有变化
+    STATIC_SIZE = (80, 45)
+    STATIC_SAD_THRESH = 80 * 45 * 2
+    # 结果文本固定的标题行，get_result_str 直接复用，不再每次拼接分隔线
+    RES_HEADER = ('当前帧检测结果:', '-' * 20)
+    RES_STATS_HEADER = ('', '累计统计:', '-' * 20)
+    # 检测记录数量标签：有记录时绿色加粗，无记录时灰色，由 hasRecords 动态属性切换
+    RECORD_COUNT_STYLE = (
+        'QLabel#label_record_count { color: gray; }'
+        'QLabel#label_record_count[hasRecords="true"] { color: green; font-weight: bold; }')
+    # frame_signal 用于子线程把待显示的帧（已缩放好的 BGR 数组）交给主线程设置到 QLabel
+    frame_signal = QtCore.pyqtSignal(np.ndarray)
+    # io_signal 用于后台保存/导出完成后通知主线程弹出提示框
+    # 参数：QMessageBox 的方法名（'information' / 'warning' / 'critical'）、标题、提示文字
+    io_signal = QtCore.pyqtSignal(str, str, str)
 
     # =========================================================================
     # setupUi - 界面初始化方法
@@ -114,8 +160,15 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         self.centralwidget.setObjectName("centralwidget")
         # 当前加载的检测器实例，初始为 None，在 cb_weights_changed() 中赋值
         self.detector = None
+        # 已加载过的检测器缓存（(权重路径, 是否 int8) → 检测器），重新选择同一模型时直接复用，最多保留 3 个
+        self._detector_cache = OrderedDict()
+        self._detector_cache_size = 3
+        self._warmup_th = None  # 模型预热线程
         # 模型权重文件目录，程序启动时会扫描此目录下的 .onnx 和 .pt 文件
         self.weights_dir = './weights'
+        # 扫描结果缓存（文件名 → 完整路径），目录的修改时间变化后才重新扫描
+        self._weights_map = {}
+        self._weights_mtime = None
         
         # ---- 初始化后处理器和视频处理器 ----
         # PostProcessor: 负责检测结果的存储、统计和导出，输出目录默认为 ./results/
@@ -124,6 +177,9 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         self.video_processor = VideoProcessor()
         # FrameRateController: 帧率控制器，默认 30fps，视频检测时会根据视频源 fps 动态调整
         self.frame_rate_controller = FrameRateController(target_fps=30)
+        # 视频检测时每次送入模型的帧数，摄像头模式不攒帧，保证实时性；
+        # 开始检测视频时换成当前检测器在预热时实测选出的 batch_size
+        self.video_batch_size = 4
         # 当前帧编号计数器，每处理一帧递增 1，用于 PostProcessor 记录帧ID
         self.current_frame_id = 0
         # 是否自动保存每帧检测图像的标志（当前未在 GUI 中暴露，预留功能）
@@ -136,11 +192,18 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         # 位置：x=260 y=10，宽 1010 高 630（会在 resizeEvent 中动态调整）
         self.picture = QtWidgets.QLabel(self.centralwidget)
         self.picture.setGeometry(QtCore.QRect(260, 10, 1010, 630))
-        # 黑色背景：未加载图像时显示黑色
-        self.picture.setStyleSheet("background:black")
+        # 深色背景（未加载图像时显示）见 beautify_left_panel 中的 QLabel#picture
         self.picture.setObjectName("picture")
-        # setScaledContents(True): 图像自动拉伸填满整个 QLabel 区域
-        self.picture.setScaledContents(True)
+        # 不使用 setScaledContents：每次绘制都要把整帧重新缩放一遍
+        # 改为在 show_frame 中按 _display_w x _display_h 等比缩放好再交给 Qt，居中显示，空白处为背景色
+        self.picture.setAlignment(QtCore.Qt.AlignCenter)
+        self._display_w, self._display_h = 1010, 630
+        # show_frame 缩放帧时轮流使用的输出缓冲区；主线程显示之前缓冲区不能被覆盖，所以准备多个
+        self._resize_bufs = [None] * 3
+        self._resize_idx = 0
+        self._pixmap_bufs = [None] * 2  # 显示用 BGRA 缓冲区，QPixmap 直接引用其内存
+        self._pixmap_imgs = [None] * 2  # 包装对应缓冲区的 QImage，缓冲区重新分配时才重新创建
+        self._pixmap_idx = 0
 
         # =====================================================================
         # 左侧控制面板 - 模型选择区域
@@ -230,11 +293,8 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         self.label_record_count.setGeometry(QtCore.QRect(10, 545, 241, 20))
         self.label_record_count.setObjectName("label_record_count")
         self.label_record_count.setText("检测记录: 0 条")
-        # 使用简单的样式表，try-except 防御样式表解析异常
-        try:
-            self.label_record_count.setStyleSheet("color: gray;")
-        except:
-            pass
+        # 颜色由窗口样式表中的 hasRecords 属性选择器决定
+        self.label_record_count.setProperty("hasRecords", False)
         
         # =====================================================================
         # 左侧控制面板 - 后处理功能按钮组
@@ -251,7 +311,6 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         self.btn_save_image.setObjectName("btn_save_image")
         self.btn_save_image.setText("保存图像")
         self.btn_save_image.clicked.connect(self.save_current_image)
-        self.btn_save_image.setStyleSheet("font-size:9pt;")
         
         # 第一行右：导出CSV按钮 → export_csv()
         self.btn_export_csv = QtWidgets.QPushButton(self.centralwidget)
@@ -259,7 +318,6 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         self.btn_export_csv.setObjectName("btn_export_csv")
         self.btn_export_csv.setText("导出CSV")
         self.btn_export_csv.clicked.connect(self.export_csv)
-        self.btn_export_csv.setStyleSheet("font-size:9pt;")
         
         # 第二行左：导出报告按钮 → export_report()
         self.btn_export_report = QtWidgets.QPushButton(self.centralwidget)
@@ -267,7 +325,6 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         self.btn_export_report.setObjectName("btn_export_report")
         self.btn_export_report.setText("导出报告")
         self.btn_export_report.clicked.connect(self.export_report)
-        self.btn_export_report.setStyleSheet("font-size:9pt;")
         
         # 第二行右：导出JSON按钮 → export_json()
         self.btn_export_json = QtWidgets.QPushButton(self.centralwidget)
@@ -275,7 +332,6 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         self.btn_export_json.setObjectName("btn_export_json")
         self.btn_export_json.setText("导出JSON")
         self.btn_export_json.clicked.connect(self.export_json)
-        self.btn_export_json.setStyleSheet("font-size:9pt;")
         
         # 第三行：清空检测记录按钮（全宽），→ clear_history()
         self.btn_clear_history = QtWidgets.QPushButton(self.centralwidget)
@@ -283,7 +339,6 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         self.btn_clear_history.setObjectName("btn_clear_history")
         self.btn_clear_history.setText("清空检测记录")
         self.btn_clear_history.clicked.connect(self.clear_history)
-        self.btn_clear_history.setStyleSheet("font-size:9pt;")
         
         # =====================================================================
         # 左侧控制面板 - 图像增强复选框
@@ -295,7 +350,20 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         self.cb_enable_enhancement.setObjectName("cb_enable_enhancement")
         self.cb_enable_enhancement.setText("启用图像增强")
         self.cb_enable_enhancement.stateChanged.connect(self.toggle_enhancement)
-        self.cb_enable_enhancement.setStyleSheet("font-size:9pt;")
+        
+        # 勾选后摄像头模式下画面基本不变时跳过推理，沿用上一次的检测结果（见 start_camera）
+        self.cb_skip_static = QtWidgets.QCheckBox(self.centralwidget)
+        self.cb_skip_static.setGeometry(QtCore.QRect(10, button_start_y + button_spacing * 3 + 30, 241, 20))
+        self.cb_skip_static.setObjectName("cb_skip_static")
+        self.cb_skip_static.setText("静止画面跳过检测")
+        self.cb_skip_static.stateChanged.connect(self.toggle_skip_static)
+        
+        # 勾选后 CPU 推理时使用动态量化的 int8 模型（在 cb_weights_changed 中重新加载当前模型）
+        self.cb_int8 = QtWidgets.QCheckBox(self.centralwidget)
+        self.cb_int8.setGeometry(QtCore.QRect(10, button_start_y + button_spacing * 3 + 55, 241, 20))
+        self.cb_int8.setObjectName("cb_int8")
+        self.cb_int8.setText("INT8 量化推理（CPU）")
+        self.cb_int8.stateChanged.connect(self.cb_weights_changed)
         
         # =====================================================================
         # 设置中心部件、菜单栏、状态栏、工具栏
@@ -394,18 +462,23 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         QtCore.QMetaObject.connectSlotsByName(self)
         # 执行初始化流程：连接信号、加载模型、美化界面
         self.init_all()
+        # 全部控件创建完成，resizeEvent 可以调整左侧面板按钮的位置
+        self._ui_ready = True
 
     # =========================================================================
     # exit - 退出程序
     # =========================================================================
     # 安全退出逻辑：先停止可能正在运行的摄像头/视频检测线程，
-    # 等待 0.2 秒让子线程有时间释放资源（如 VideoCapture），再退出应用
+    # 等待子线程真正结束（已释放 VideoCapture 等资源），再退出应用
     def exit(self):
-        if self.camera_open:
-            # 设置标志位通知子线程停止循环
+        if self.worker is not None and self.worker.isRunning():
+            # 设置标志位并请求中断，通知子线程停止循环
             self.camera_open = False
-            # 等待子线程响应停止信号并释放 VideoCapture 资源
-            time.sleep(0.2)
+            self.worker.requestInterruption()
+            # 等待子线程退出循环并释放 VideoCapture 资源
+            self.worker.wait()
+        # 等待还没写完的保存/导出任务完成，避免文件只写了一半
+        self._io_pool.shutdown(wait=True)
         # 获取当前 QApplication 实例并退出
         app = QApplication.instance()
         app.quit()
@@ -415,27 +488,54 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
     # =========================================================================
     # 当用户在模型下拉框中选择不同的模型文件时触发。
     # 使用 create_detector 工厂函数加载新模型，同时传入当前 GUI 上的置信度和 IOU 值。
+    # 加载过的模型保存在 _detector_cache 中（按权重路径和是否 int8 区分），再次选择时直接取出并同步阈值，
+    # int8 只对 CPU 推理生效，在 GPU 上运行的检测器一律以 (权重路径, False) 缓存，切换复选框时直接复用；
+    # 不再重新加载；缓存按最近使用顺序淘汰，避免同时占用过多内存/显存。
+    # 切换 "INT8 量化推理" 复选框时同样调用此方法，重新选择对应的检测器。
     # 加载过程中临时修改窗口标题为 "正在加载模型中.."，完成后恢复原标题。
     def cb_weights_changed(self):
         # 空文本时（如下拉框初始化）忽略
         if self.cb_weights.currentText() == "":
             return
+        weights_path = self.get_weights_path(self.cb_weights.currentText())
+        int8 = self.cb_int8.isChecked()
+        cache_key = (weights_path, int8)
+        if int8 and getattr(self._detector_cache.get((weights_path, False)), 'device', 'cpu') != 'cpu':
+            cache_key = (weights_path, False)
+        # 命中缓存：移到最近使用的位置，同步 GUI 上的阈值
+        if cache_key in self._detector_cache:
+            self._detector_cache.move_to_end(cache_key)
+            self.detector = self._detector_cache[cache_key]
+            self.set_cv_threads(self.detector)
+            self.detector.set_confidence(self.dsb_conf.value())
+            self.detector.set_iou(self.dsb_iou.value())
+            if hasattr(self, 'ssl_show'):
+                self.ssl_show.setText(f"模型加载成功: {self.cb_weights.currentText()}")
+            return
         # 保存当前窗口标题，加载完成后恢复
         title = self.windowTitle()
         self.setWindowTitle('正在加载模型中..')
         try:
-            # 拼接完整的模型文件路径
-            weights_path = os.path.join(self.weights_dir, self.cb_weights.currentText())
             # 调用工厂函数创建检测器实例
             # model_type='auto' 会根据文件扩展名自动选择 ONNX 或 PyTorch 检测器
             # conf_thres 和 iou_thres 从 GUI 控件获取当前值
             self.detector = create_detector(weights_path, model_type='auto',
                                            conf_thres=self.dsb_conf.value(),
-                                           iou_thres=self.dsb_iou.value())
+                                           iou_thres=self.dsb_iou.value(),
+                                           int8=int8)
+            if self.detector.device != 'cpu':
+                cache_key = (weights_path, False)
+            self._detector_cache[cache_key] = self.detector
+            self.set_cv_threads(self.detector)
+            if len(self._detector_cache) > self._detector_cache_size:
+                self._detector_cache.popitem(last=False)  # 淘汰最久未使用的检测器
             # 加载成功，恢复标题并更新状态栏
             self.setWindowTitle(title)
             if hasattr(self, 'ssl_show'):
                 self.ssl_show.setText(f"模型加载成功: {self.cb_weights.currentText()}")
+            # 后台线程用模型输入尺寸预热一次，避免首帧卡顿，下拉框不会被阻塞
+            self._warmup_th = threading.Thread(target=self.warmup_detector, args=(self.detector,), daemon=True)
+            self._warmup_th.start()
         except Exception as e:
             # 加载失败，恢复标题并弹出错误对话框
             self.setWindowTitle(title)
@@ -443,18 +543,50 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
             if hasattr(self, 'ssl_show'):
                 self.ssl_show.setText(f"模型加载失败: {str(e)}")
 
+    # CPU 推理时 OpenCV 只用 2 个线程，其余核心留给 ONNX Runtime；
+    # GPU 推理时 CPU 上只剩预处理和绘制，OpenCV 可以使用除一个核心外的全部核心
+    def set_cv_threads(self, detector):
+        if getattr(detector, 'device', 'cpu') == 'cpu':
+            cv2.setNumThreads(2)
+        else:
+            cv2.setNumThreads(max(1, (os.cpu_count() or 1) - 1))
+
+    # =========================================================================
+    # warmup_detector - 模型预热（运行在子线程中）
+    # =========================================================================
+    # 首次推理要完成图优化、卷积算法选择等初始化工作，这里用一张与模型输入同尺寸的空白图提前跑一次，
+    # 再按实测耗时选出视频检测的 batch 大小（tune_batch_size），各个 batch 形状也同时完成了初始化。
+    # 检测器的输入缓冲区不能被两个线程同时使用：预热持有 detector.lock，检测循环每次推理也持有它，
+    # 检测过程中切换到仍在预热的模型时，推理会等预热结束再进行；
+    # 检测开始前还会先等待预热线程结束（wait_warmup），视频检测使用调整后的 batch 大小。
+    def warmup_detector(self, detector):
+        try:
+            with detector.lock:
+                detector.inference_image(np.zeros((*detector.img_size, 3), dtype=np.uint8))
+                detector.tune_batch_size()
+            self.signal.emit('模型预热完成', 'model')
+        except Exception as e:
+            self.signal.emit(f"模型预热失败: {str(e)}", 'model')
+
+    def wait_warmup(self):
+        if self._warmup_th is not None:
+            self._warmup_th.join()
+
     # =========================================================================
     # open_camera - 摄像头按钮点击回调
     # =========================================================================
     # 按钮文字在 "打开摄像头" 和 "停止" 之间切换，实现开启/停止的状态切换逻辑。
-    # 开启时在新线程中启动 start_camera()，停止时设置 camera_open=False 通知子线程退出。
+    # 开启时在 CaptureWorker 线程中运行 start_camera()，停止时设置 camera_open=False 通知子线程退出。
     def open_camera(self):
         if self.action_2.text() == '打开摄像头':
+            # 前置检查：是否已加载模型（弹窗必须在主线程中）
+            if self.detector is None:
+                QMessageBox.warning(self, "警告", "请先选择模型!")
+                return
             # 切换按钮文字为"停止"
             self.action_2.setText('停止')
-            # 在新线程中启动摄像头检测循环，避免阻塞 GUI 主线程
-            th = threading.Thread(target=self.start_camera)
-            th.start()
+            # 在检测线程中启动摄像头检测循环，避免阻塞 GUI 主线程
+            self.start_worker(CaptureWorker(self.start_camera, action=self.action_2, idle_text='打开摄像头'))
         else:
             # 用户点击"停止"，恢复按钮文字并设置停止标志
             self.action_2.setText('打开摄像头')
@@ -472,8 +604,10 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
     #   其他值（如 'camera', 'video'）: 更新底部状态栏的提示文字
     def set_res(self, res, flag):
         if flag == 'res':
-            # 更新结果文本框内容
-            self.le_res.setPlainText(res)
+            # 更新结果文本框内容：文字与上次相同时跳过，避免 QTextEdit 重新排版
+            if res != self._last_res:
+                self._last_res = res
+                self.le_res.setPlainText(res)
             # 在主线程中更新记录数量显示（避免频繁调用）
             self.update_record_count()
         else:
@@ -491,13 +625,42 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
     # 4. 扫描并加载模型文件列表
     # 5. 自动加载第一个模型
     # 6. 美化左侧面板样式
+    #
+    # 摄像头/视频循环每帧都会产生结果文本，不直接 emit，而是写入 _pending_res，
+    # 由 _res_timer 每 100 ms 取最新的一条更新文本框，QTextEdit 的重新排版从每帧一次降到每秒 10 次。
     def init_all(self):
         # 将 signal 信号连接到 set_res 槽函数
         self.signal.connect(self.set_res)
+        # 将 frame_signal 信号连接到 on_frame 槽函数（显示画面）
+        self.frame_signal.connect(self.on_frame)
+        # 将 io_signal 信号连接到 on_io_done 槽函数（保存/导出结果提示）
+        self.io_signal.connect(self.on_io_done)
+        # 文件保存/导出线程池：只用一个线程，多次导出按点击顺序依次执行
+        self._io_pool = ThreadPoolExecutor(max_workers=1)
         # 初始化状态变量
         self.image_path = None       # 当前打开的图片路径
         self.camera_open = False     # 摄像头/视频是否正在运行的标志位
-        self.current_frame = None    # 当前显示的帧（用于"保存图像"功能）
+        self.worker = None           # 当前的摄像头/视频检测线程（CaptureWorker）
+        self.skip_static = False     # 摄像头/视频模式下静止画面是否跳过推理（由 cb_skip_static 控制）
+        self.current_frame = None    # 当前显示的帧（用于"保存图像"功能），检测循环发布后不再修改
+        # 摄像头模式的界面刷新节流：_frames_emitted 在 show_frame 中（发出帧的线程）递增，
+        # _frames_shown 在 on_frame 中（主线程）递增，差值即尚未显示的帧数；图片、视频显示的帧也计入
+        self._last_emit_ts = 0.0
+        self._frames_emitted = 0
+        self._frames_shown = 0
+        self._last_record_count = 0  # 记录数量标签当前显示的数量（初始文字为 0 条）
+        # 结果文本合并刷新：子线程只保存最新的一条，定时器在主线程中取出并更新
+        self._pending_res = None
+        self._last_res = None  # 结果文本框当前显示的文字
+        # get_result_str 中累计统计部分的缓存：生成时的 (检测记录数, 清空次数) 和对应的文本行
+        self._stats_key = None
+        self._stats_lines = []
+        self._res_timer = QtCore.QTimer(self)
+        self._res_timer.setInterval(100)
+        self._res_timer.timeout.connect(self.flush_res)
+        self._res_timer.start()
+        # OpenMP 线程数已在文件开头设置；OpenCV 的线程池可随时调整，加载模型后由 set_cv_threads 按设备重新设置
+        cv2.setNumThreads(2)
         # 先初始化状态栏，确保 ssl_show 存在
         # 重要：必须在 load_weights_to_list 之前调用，因为加载模型会尝试访问 ssl_show
         self.initStatusBar()
@@ -509,6 +672,11 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         # 美化左侧面板的字体和样式
         self.beautify_left_panel()
 
+    def flush_res(self):
+        res, self._pending_res = self._pending_res, None
+        if res is not None:
+            self.set_res(res, 'res')
+
     # =========================================================================
     # resizeEvent - 窗口尺寸变化事件处理
     # =========================================================================
@@ -521,30 +689,30 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         # 调整图像显示区域：占满左侧面板右边的全部剩余空间
         self.picture.setFixedSize(self.width() - self.le_res.x() - self.le_res.width() - 20,
                                   self.height() - self.statusbar.height())
+        # 记录显示区域尺寸，子线程按此尺寸缩放帧
+        self._display_w, self._display_h = self.picture.width(), self.picture.height()
+        
+        # setupUi 完成前（控件还没全部创建）不调整按钮位置，一次属性查找代替逐个 hasattr 检查
+        if not getattr(self, '_ui_ready', False):
+            return
         
         # 调整按钮位置（相对于结果文本框底部动态定位）
         button_start_y = self.le_res.y() + self.le_res.height() + 10
         
         # 检测记录数量标签
-        if hasattr(self, 'label_record_count'):
-            self.label_record_count.move(10, button_start_y)
-            button_start_y += 25
+        self.label_record_count.move(10, button_start_y)
+        button_start_y += 25
         
         # 按钮组逐行排列
-        # hasattr 检查确保在 setupUi 完成前调用 resizeEvent 不会报错
         button_spacing = 35
-        if hasattr(self, 'btn_save_image'):
-            self.btn_save_image.move(10, button_start_y)
-            if hasattr(self, 'btn_export_csv'):
-                self.btn_export_csv.move(130, button_start_y)
-            if hasattr(self, 'btn_export_report'):
-                self.btn_export_report.move(10, button_start_y + button_spacing)
-            if hasattr(self, 'btn_export_json'):
-                self.btn_export_json.move(130, button_start_y + button_spacing)
-            if hasattr(self, 'btn_clear_history'):
-                self.btn_clear_history.move(10, button_start_y + button_spacing * 2)
-            if hasattr(self, 'cb_enable_enhancement'):
-                self.cb_enable_enhancement.move(10, button_start_y + button_spacing * 3 + 5)
+        self.btn_save_image.move(10, button_start_y)
+        self.btn_export_csv.move(130, button_start_y)
+        self.btn_export_report.move(10, button_start_y + button_spacing)
+        self.btn_export_json.move(130, button_start_y + button_spacing)
+        self.btn_clear_history.move(10, button_start_y + button_spacing * 2)
+        self.cb_enable_enhancement.move(10, button_start_y + button_spacing * 3 + 5)
+        self.cb_skip_static.move(10, button_start_y + button_spacing * 3 + 30)
+        self.cb_int8.move(10, button_start_y + button_spacing * 3 + 55)
 
     # =========================================================================
     # initStatusBar - 初始化底部状态栏
@@ -581,47 +749,71 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
                                                                        "Video File(*.mp4 *.avi *.flv)")
             if fileName == '':
                 return
+            if self.detector is None:
+                QMessageBox.warning(self, "警告", "请先选择模型!")
+                return
             self.action.setText('停止')
-            # 在新线程中启动视频检测循环，传入视频文件路径
-            th = threading.Thread(target=self.start_video, args=(fileName,))
-            th.start()
+            # 在检测线程中启动视频检测循环，传入视频文件路径
+            self.start_worker(CaptureWorker(self.start_video, fileName, action=self.action, idle_text='选择视频'))
         else:
             self.action.setText('选择视频')
             self.camera_open = False
 
     # =========================================================================
-    # start_camera - 摄像头检测主循环（运行在子线程中）
+    # start_worker / on_worker_finished - 检测线程的启动与结束
+    # =========================================================================
+    # finished 信号在主线程中处理：恢复按钮文字、清空显示区域。
+    def start_worker(self, worker):
+        self.worker = worker
+        worker.finished.connect(self.on_worker_finished)
+        worker.start()
+
+    def on_worker_finished(self):
+        worker = self.sender()
+        if worker.action is not None:
+            worker.action.setText(worker.idle_text)
+        # 清空显示区域（显示黑色背景）
+        self.picture.setPixmap(QPixmap(""))
+
+    # =========================================================================
+    # start_camera - 摄像头检测主循环（运行在 CaptureWorker 线程中）
     # =========================================================================
     # 完整的实时检测流水线：
     #   打开摄像头 → 循环{读帧 → 预处理 → 推理 → 记录 → 绘制 → 显示} → 释放摄像头
     #
     # 线程安全说明：
     # - camera_open 标志位由主线程写入（设为 False），子线程读取（检查是否继续循环）
-    # - UI 更新通过 signal.emit() 发送到主线程处理
-    # - QPixmap.fromImage() 虽然在子线程中调用，但 QLabel.setPixmap 是线程安全的
+    # - 文本通过 signal.emit()、画面通过 frame_signal.emit() 发送到主线程处理，子线程不操作控件
+    # - 模型是否已加载由 open_camera 在主线程中检查
     def start_camera(self, camera_index=0):
-        # 前置检查：是否已加载模型
-        if self.detector is None:
-            QMessageBox.warning(self, "警告", "请先选择模型!")
-            self.action_2.setText('打开摄像头')
-            return
+        self.wait_warmup()
         
         # 通过信号通知主线程更新状态栏
         self.signal.emit('正在检测摄像头中...','camera')
         # 打开摄像头（默认设备索引 0，即系统默认摄像头）
         cap = cv2.VideoCapture(camera_index)
+        # 驱动默认会缓存多帧，检测跟不上时读到的是几秒前的画面；缓冲区设为 1 帧只保留最新画面
+        # MJPG 压缩传输可降低 USB 带宽占用，摄像头不支持时 set 返回 False，不影响使用
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         self.camera_open = True
         self.current_frame_id = 0
+        # 启动采集线程：队列满时丢弃新帧，检测循环总是处理最近的画面
+        capture_th, frame_q = self._start_capture(cap, drop_on_full=True)
+        
+        # 上一次推理的帧的缩略灰度图及其检测结果，供静止画面跳过推理时使用
+        prev_gray, last_result_lists = None, []
         
         # ---- 检测主循环 ----
-        while self.camera_open:
-            # 读取一帧图像
-            ret, frame = cap.read()
-            if not ret:
+        worker = QThread.currentThread()
+        while self.camera_open and not worker.isInterruptionRequested():
+            # 从队列取一帧图像，超时后重新检查 camera_open
+            try:
+                frame = frame_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if frame is None:
                 # 读取失败（摄像头断开等），退出循环
-                self.action_2.setText('打开摄像头')
-                self.camera_open = False
-                self.signal.emit('摄像头检测已停止!', 'camera')
                 break
             
             # 步骤1：视频预处理（分辨率缩放、图像增强等，由 VideoProcessor 处理）
@@ -629,31 +821,37 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
             
             # 步骤2：YOLOv5 模型推理，返回检测结果列表
             # 格式：[[class_name, confidence, x1, y1, x2, y2], ...]
-            result_lists = self.detector.inference_image(frame)
+            # 勾选"静止画面跳过检测"且画面与上一次推理的帧几乎相同时，直接沿用上一次的结果
+            # 本帧的推理和绘制使用同一个检测器，检测中切换模型时从下一帧开始生效
+            detector = self.detector
+            gray = self._static_thumb(frame) if self.skip_static else None
+            if self._is_static(gray, prev_gray):
+                result_lists = last_result_lists
+            else:
+                with detector.lock:
+                    result_lists = detector.inference_image(frame)
+                prev_gray, last_result_lists = gray, result_lists
             
-            # 步骤3：将检测结果记录到后处理器（用于统计和导出）
-            self.post_processor.add_detection(result_lists, frame_id=self.current_frame_id)
+            # 各类别数量只统计一次，累计统计、告警条和结果文本共用
+            counts = self._count_classes(result_lists)
             
-            # 步骤4：在帧上绘制检测框和标签
-            frame = self.detector.draw_image(result_lists, frame)
-            # 步骤5：在帧顶部叠加告警信息条（时间戳 + 检测摘要）
-            frame = self.add_alarm_overlay(frame, result_lists)
+            # 步骤3：将检测结果记录到后处理器（用于统计和导出）
+            self.post_processor.add_detection(result_lists, frame_id=self.current_frame_id, counts=counts)
             
-            # 步骤6：生成结果文本并通过信号发送到主线程更新 GUI
-            res = self.get_result_str(result_lists)
-            self.signal.emit(res, 'res')
+            # 步骤4、5：在帧上绘制检测框和标签，并在帧顶部叠加告警信息条（时间戳 + 检测摘要）
+            frame = detector.render_annotations(frame, result_lists, self.get_alarm_text(result_lists, counts))
             
-            # 保存当前帧的副本（用户点击"保存图像"按钮时保存此帧）
-            # .copy() 确保不受后续帧覆盖的影响
-            self.current_frame = frame.copy()
+            # 记录当前帧（用户点击"保存图像"按钮时保存此帧）
+            # 每次 cap.read() 都返回新的数组，这里之后不再修改它，直接保存引用即可，不必整帧拷贝
+            self.current_frame = frame
             
-            # 步骤7：将 OpenCV BGR 图像转为 Qt 可显示的格式并更新到 QLabel
-            # BGR → RGB 色彩转换（OpenCV 默认 BGR，Qt 显示需要 RGB）
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            # 创建 QImage 对象：传入像素数据、宽、高、格式
-            img = QImage(frame_rgb.data, frame_rgb.shape[1], frame_rgb.shape[0], QImage.Format_RGB888)
-            # 转为 QPixmap 并设置到显示标签
-            self.picture.setPixmap(QPixmap.fromImage(img))
+            # 界面跟不上时跳过本帧的步骤6、7，检测和记录照常进行
+            if self.gui_ready():
+                # 步骤6：生成结果文本，由主线程的定时器取出更新 GUI
+                self._pending_res = self.get_result_str(result_lists, counts)
+                
+                # 步骤7：转为 Qt 可显示的格式，交给主线程更新到 QLabel
+                self.show_frame(frame)
             
             # 帧计数器递增
             self.current_frame_id += 1
@@ -661,27 +859,22 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
             self.frame_rate_controller.wait_if_needed()
         
         # ---- 循环结束后的清理工作 ----
-        # 释放摄像头资源
-        cap.release()
-        # 恢复按钮文字
-        self.action_2.setText('打开摄像头')
+        # 等采集线程退出后再释放摄像头资源，按钮文字和显示区域由 on_worker_finished 恢复
         self.camera_open = False
+        capture_th.join()
+        cap.release()
         self.signal.emit('摄像头检测已停止!', 'camera')
-        # 清空显示区域（显示黑色背景）
-        self.picture.setPixmap(QPixmap(""))
 
     # =========================================================================
-    # start_video - 视频文件检测主循环（运行在子线程中）
+    # start_video - 视频文件检测主循环（运行在 CaptureWorker 线程中）
     # =========================================================================
     # 与 start_camera 的流程基本一致，区别在于：
     # 1. 输入源是视频文件而非摄像头
     # 2. 开始前会获取视频元信息（fps、分辨率、时长）并显示到状态栏
     # 3. 帧率控制器会根据视频源的 fps 动态调整，确保视频以原始速度播放
     def start_video(self, video_file):
-        if self.detector is None:
-            QMessageBox.warning(self, "警告", "请先选择模型!")
-            self.action.setText('选择视频')
-            return
+        self.wait_warmup()
+        self.video_batch_size = self.detector.batch_size
         
         self.signal.emit('正在检测视频中...', 'video')
         
@@ -693,45 +886,164 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
             self.frame_rate_controller.set_fps(fps)
             # 在状态栏显示视频信息（分辨率、帧率、时长）
             info_text = f"视频信息: {video_info['width']}x{video_info['height']}, {fps}fps, {video_info.get('duration', 0):.1f}秒"
-            if hasattr(self, 'ssl_show'):
-                self.ssl_show.setText(info_text)
+            self.signal.emit(info_text, 'video')
         
         # 打开视频文件
         cap = cv2.VideoCapture(video_file)
         self.camera_open = True
         self.current_frame_id = 0
+        # 视频文件不丢帧：队列满时采集线程等待，避免跳着播放
+        capture_th, frame_q = self._start_capture(cap, drop_on_full=False)
         
-        # ---- 检测主循环（与 start_camera 结构相同）----
-        while self.camera_open:
-            ret, frame = cap.read()
-            if not ret:
-                # 视频播放完毕或读取错误
-                self.action.setText('选择视频')
-                self.camera_open = False
-                self.signal.emit('视频检测已停止!', 'video')
-                break
+        # 上一次推理的帧的缩略灰度图及其检测结果，供静止画面跳过推理时使用
+        prev_gray, last_result_lists = None, []
+        
+        # ---- 检测主循环（与 start_camera 结构相同，但攒够 video_batch_size 帧后批量推理）----
+        video_end = False
+        worker = QThread.currentThread()
+        while self.camera_open and not video_end and not worker.isInterruptionRequested():
+            batch = []
+            while self.camera_open and len(batch) < self.video_batch_size:
+                try:
+                    frame = frame_q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if frame is None:
+                    # 视频播放完毕或读取错误，先处理完已攒下的帧再退出
+                    video_end = True
+                    break
+                # 预处理
+                batch.append(self.video_processor.process_frame(frame))
+            if not batch:
+                continue
 
-            # 预处理 → 推理 → 记录 → 绘制 → 告警叠加 → GUI更新 → 显示
-            frame = self.video_processor.process_frame(frame)
-            result_lists = self.detector.inference_image(frame)
-            self.post_processor.add_detection(result_lists, frame_id=self.current_frame_id)
-            frame = self.detector.draw_image(result_lists, frame)
-            frame = self.add_alarm_overlay(frame, result_lists)
-            res = self.get_result_str(result_lists)
-            self.signal.emit(res, 'res')
-            self.current_frame = frame.copy()
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = QImage(frame_rgb.data, frame_rgb.shape[1], frame_rgb.shape[0], QImage.Format_RGB888)
-            self.picture.setPixmap(QPixmap.fromImage(img))
-            self.current_frame_id += 1
-            self.frame_rate_controller.wait_if_needed()
+            # 勾选"静止画面跳过检测"时，与上一次推理的帧几乎相同的帧不送入推理，沿用那一帧的结果；
+            # src[i] 为第 i 帧结果在 to_infer 中的下标，-1 表示上一个 batch 最后推理的帧
+            to_infer, src = [], []
+            for frame in batch:
+                gray = self._static_thumb(frame) if self.skip_static else None
+                if not self._is_static(gray, prev_gray):
+                    to_infer.append(frame)
+                    prev_gray = gray
+                src.append(len(to_infer) - 1)
+            detector = self.detector  # 整个 batch 使用同一个检测器
+            results = []
+            if to_infer:
+                with detector.lock:
+                    results = detector.inference_image_batch(to_infer)
+            batch_results = [results[j] if j >= 0 else last_result_lists for j in src]
+            if results:
+                last_result_lists = results[-1]
+
+            # 一次推理整个 batch，再逐帧 记录 → 绘制 → 告警叠加 → GUI更新 → 显示
+            for frame, result_lists in zip(batch, batch_results):
+                if not self.camera_open:
+                    break
+                counts = self._count_classes(result_lists)
+                self.post_processor.add_detection(result_lists, frame_id=self.current_frame_id, counts=counts)
+                frame = detector.render_annotations(frame, result_lists, self.get_alarm_text(result_lists, counts))
+                self._pending_res = self.get_result_str(result_lists, counts)
+                self.current_frame = frame
+                self.show_frame(frame)
+                self.current_frame_id += 1
+                self.frame_rate_controller.wait_if_needed()
         
         # 清理
-        cap.release()
-        self.action.setText('选择视频')
         self.camera_open = False
+        capture_th.join()
+        cap.release()
         self.signal.emit('视频检测已停止!', 'video')
-        self.picture.setPixmap(QPixmap(""))
+
+    # =========================================================================
+    # gui_ready - 摄像头模式下判断本帧是否刷新界面
+    # =========================================================================
+    # 距上次刷新不足 1/30 秒，或主线程还有 2 帧以上没显示（界面跟不上）时返回 False，
+    # 子线程跳过本帧的结果文本和画面，避免 Qt 事件队列积压导致延迟越来越大。
+    def gui_ready(self):
+        now = time.monotonic()
+        if now - self._last_emit_ts < 1 / 30 or self._frames_emitted - self._frames_shown > 2:
+            return False
+        self._last_emit_ts = now
+        return True
+
+    # =========================================================================
+    # show_frame / on_frame - 显示图片/视频/摄像头帧
+    # =========================================================================
+    # show_frame 可在任意线程调用：先把帧等比缩放到显示区域大小（_display_w x _display_h），
+    # Qt 绘制时不再需要缩放。缩放好的数组通过 frame_signal 发给主线程，on_frame 用 cv2 把它补成 BGRA
+    # （小端下就是 Qt 光栅后端原生的 Format_RGB32，不需要 BGR → RGB 转换），QPixmap.fromImage 直接
+    # 引用这块内存，整个显示过程只有 cv2 的这一次整帧拷贝，Qt 内部不再做格式转换。
+    # 控件只在主线程中操作，子线程发出信号后即可继续处理下一帧。
+    def show_frame(self, frame):
+        height, width = frame.shape[:2]
+        scale = min(self._display_w / width, self._display_h / height)
+        new_size = max(int(width * scale), 1), max(int(height * scale), 1)
+        if new_size != (width, height):
+            # 缩放结果轮流写入 _resize_bufs 中的缓冲区，尺寸不变时不再每帧分配新数组。
+            # 摄像头模式最多有 3 帧等待显示（见 gui_ready），缓冲区被覆盖前主线程已经显示完这一帧；
+            # 视频模式受帧率控制，主线程同样来得及显示，即使落后也只是显示到较新的画面
+            buf_shape = (new_size[1], new_size[0]) + frame.shape[2:]
+            self._resize_idx = (self._resize_idx + 1) % len(self._resize_bufs)
+            buf = self._resize_bufs[self._resize_idx]
+            if buf is None or buf.shape != buf_shape or buf.dtype != frame.dtype:
+                buf = self._resize_bufs[self._resize_idx] = np.empty(buf_shape, dtype=frame.dtype)
+            frame = cv2.resize(frame, new_size, dst=buf, interpolation=cv2.INTER_LINEAR)
+        # 未缩放时直接发送 frame 本身：检测循环发布后不会再修改它
+        self._frames_emitted += 1
+        self.frame_signal.emit(np.ascontiguousarray(frame))  # 已连续时不拷贝
+
+    def on_frame(self, frame):
+        self._frames_shown += 1
+        # QPixmap 引用缓冲区内存，两个缓冲区轮流使用：写入的总是标签当前没有显示的那个，写完再 setPixmap 替换
+        height, width = frame.shape[:2]
+        self._pixmap_idx ^= 1
+        buf = self._pixmap_bufs[self._pixmap_idx]
+        if buf is None or buf.shape[:2] != (height, width):
+            buf = self._pixmap_bufs[self._pixmap_idx] = np.empty((height, width, 4), dtype=np.uint8)
+            self._pixmap_imgs[self._pixmap_idx] = QImage(buf.data, width, height, buf.strides[0], QImage.Format_RGB32)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA, dst=buf)
+        self.picture.setPixmap(QPixmap.fromImage(self._pixmap_imgs[self._pixmap_idx], QtCore.Qt.NoFormatConversion))
+
+    # =========================================================================
+    # _start_capture - 启动采集线程
+    # =========================================================================
+    # 采集线程只负责 cap.read()，把帧放进返回的队列，读取失败时放入 None 作为结束标志。
+    # 队列是每次调用新建的局部对象，由采集线程和调用方的检测循环各自持有：旧的采集线程还没退出时
+    # 开始新的检测，两个来源的帧也不会混进对方的循环。返回 (采集线程, 队列)。
+    # drop_on_full=True（摄像头）：队列只有 1 个位置，队列满时丢弃其中较旧的帧换成刚读到的帧，
+    # 推理跟不上时检测循环拿到的总是最新画面，不依赖驱动是否支持 CAP_PROP_BUFFERSIZE；
+    # drop_on_full=False（视频文件）：maxsize=video_batch_size，队列满时等待，保证每一帧都被检测；
+    # 正在推理一个 batch 时采集线程可以把下一个 batch 的帧全部解码好。
+    # 加上检测线程（推理、绘制、缩放）和主线程（setPixmap），采集/推理/显示三个阶段各在一个线程中重叠进行，
+    # 有界队列（摄像头模式另有 gui_ready 限制待显示的帧数）提供背压，内存占用固定。
+    # camera_open 变为 False 时线程退出。
+    def _start_capture(self, cap, drop_on_full):
+        frame_q = queue.Queue(maxsize=1 if drop_on_full else self.video_batch_size)
+
+        def put(item, block):
+            while self.camera_open:
+                try:
+                    frame_q.put(item, block=block, timeout=0.1 if block else None)
+                    return
+                except queue.Full:
+                    if not block:
+                        # 取出还没被处理的旧帧丢弃，再放入新帧
+                        try:
+                            frame_q.get_nowait()
+                        except queue.Empty:
+                            pass
+
+        def capture():
+            while self.camera_open:
+                ret, frame = cap.read()
+                if not ret:
+                    put(None, block=True)
+                    return
+                put(frame, block=not drop_on_full)
+
+        th = threading.Thread(target=capture, daemon=True)
+        th.start()
+        return th, frame_q
 
     # =========================================================================
     # open_image - 图片按钮点击回调
@@ -739,6 +1051,10 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
     # 弹出文件对话框让用户选择一张图片，然后在子线程中执行 start_image() 进行检测。
     # 虽然图片检测是一次性操作（非循环），但仍放在子线程中以避免阻塞 GUI。
     def open_image(self):
+        # 前置检查：是否已加载模型（弹窗必须在主线程中）
+        if self.detector is None:
+            QMessageBox.warning(self, "警告", "请先选择模型!")
+            return
         # 打开文件对话框，支持 jpg/jpeg/bmp/png 格式
         imgName, imgType = QFileDialog.getOpenFileName(self, "打开图片", "",
                                                        "图片文件 (*.jpg *.jpeg *.bmp *.png);;All Files(*)")
@@ -757,35 +1073,36 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
     # =========================================================================
     # 将当前帧的检测结果和累计统计信息格式化为人类可读的多行文本字符串，
     # 用于显示在左侧面板的结果文本框中。
-    def get_result_str(self, result_list):
+    # counts 为 _count_classes 的统计结果，调用方已经统计过时传入，避免重复计数。
+    def get_result_str(self, result_list, counts=None):
         # ---- 统计当前帧各类别的检测数量 ----
-        result_dict = {}
-        for result in result_list:
-            name = result[0]  # 类别名称
-            if name in result_dict.keys():
-                result_dict[name] += 1
-            else:
-                result_dict[name] = 1
+        result_dict = counts if counts is not None else self._count_classes(result_list)
         
-        # ---- 从后处理器获取全局累计统计 ----
-        stats = self.post_processor.get_statistics()
+        # ---- 组合当前帧结果文本：逐行放入列表，最后一次 join，不产生中间字符串 ----
+        parts = list(self.RES_HEADER)
+        parts.extend(f"{k}: {v}" for k, v in result_dict.items())
         
-        # ---- 组合当前帧结果文本 ----
-        res = '当前帧检测结果:\n'
-        res += '-' * 20 + '\n'
-        for k, v in result_dict.items():
-            res += f"{k}: {v}\n"
-        
-        # ---- 追加累计统计文本（包含百分比） ----
-        if stats:
-            res += '\n累计统计:\n'
-            res += '-' * 20 + '\n'
-            total = sum(stats.values())
-            for k, v in stats.items():
-                percentage = (v / total * 100) if total > 0 else 0
-                res += f"{k}: {v} ({percentage:.1f}%)\n"
+        # ---- 追加累计统计文本（包含百分比），没有累计记录时跳过 ----
+        # 检测记录只在末尾追加，记录数和清空次数都没变时累计统计也没变，直接复用上次生成的文本行；
+        # 清空次数用来识别清空后重新累计到相同数量的情况。
+        # 百分比在 Python 中逐项计算：类别数很少，格式化字符串才是主要开销，
+        # 换成 numpy 批量计算反而更慢（数组创建和 tolist 的固定开销大于省下的除法）
+        stats_key = (len(self.post_processor), self.post_processor.clear_count)
+        if stats_key != self._stats_key:
+            stats = self.post_processor.get_statistics()
+            lines = []
+            if stats:
+                total = sum(stats.values())
+                lines += self.RES_STATS_HEADER
+                if total > 0:
+                    lines.extend(f"{k}: {v} ({v / total * 100:.1f}%)" for k, v in stats.items())
+                else:
+                    lines.extend(f"{k}: {v} (0.0%)" for k, v in stats.items())
+            self._stats_key, self._stats_lines = stats_key, lines
+        parts += self._stats_lines
         
-        return res
+        parts.append('')  # 末尾保留换行，与之前的格式一致
+        return '\n'.join(parts)
     
     # =========================================================================
     # update_record_count - 更新检测记录数量标签
@@ -795,139 +1112,148 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         if not hasattr(self, 'label_record_count'):
             return
         
-        count = len(self.post_processor.detection_history)
+        # 数量没变时不重新设置文字，避免标签重新计算尺寸和重绘
+        count = len(self.post_processor)
+        if count == self._last_record_count:
+            return
+        self._last_record_count = count
         self.label_record_count.setText(f"检测记录: {count} 条")
         
-        try:
-            if count > 0:
-                self.label_record_count.setStyleSheet("color: green; font-weight: bold;")
-            else:
-                self.label_record_count.setStyleSheet("color: gray;")
-        except:
-            pass
+        # 只在有/无记录的状态变化时切换属性并重新应用样式，不必每次都重新解析样式表
+        has_records = count > 0
+        if self.label_record_count.property("hasRecords") != has_records:
+            self.label_record_count.setProperty("hasRecords", has_records)
+            style = self.label_record_count.style()
+            style.unpolish(self.label_record_count)
+            style.polish(self.label_record_count)
 
     # =========================================================================
     # start_image - 图片检测处理（运行在子线程中）
     # =========================================================================
+    # 读取解码、推理和绘制都在子线程中完成；子线程不操作控件，
+    # 提示框通过 io_signal、状态栏文字和结果文本通过 signal 交给主线程
     def start_image(self):
-        if self.detector is None:
-            QMessageBox.warning(self, "警告", "请先选择模型!")
-            return
+        self.wait_warmup()
         
         frame = cv2.imread(self.image_path)
         if frame is None:
-            QMessageBox.warning(self, "错误", "无法读取图像文件!")
+            self.io_signal.emit('warning', "错误", "无法读取图像文件!")
             return
 
         frame = self.video_processor.process_frame(frame)
-        result_lists = self.detector.inference_image(frame)
-        self.post_processor.add_detection(result_lists, frame_id=0)
-        frame = self.detector.draw_image(result_lists, frame)
-        frame = self.add_alarm_overlay(frame, result_lists)
-        self.current_frame = frame.copy()
-        
-        height, width = frame.shape[:2]
-        max_width = self.picture.width()
-        max_height = self.picture.height()
-        scale = min(max_width / width, max_height / height, 1.0)
-        new_width = int(width * scale)
-        new_height = int(height * scale)
-        frame_resized = cv2.resize(frame, (new_width, new_height))
+        detector = self.detector
+        with detector.lock:
+            result_lists = detector.inference_image(frame)
+        counts = self._count_classes(result_lists)
+        self.post_processor.add_detection(result_lists, frame_id=0, counts=counts)
+        frame = detector.render_annotations(frame, result_lists, self.get_alarm_text(result_lists, counts))
+        self.current_frame = frame
         
-        frame_rgb = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB)
-        img = QImage(frame_rgb.data, frame_rgb.shape[1], frame_rgb.shape[0], QImage.Format_RGB888)
-        self.picture.setPixmap(QPixmap.fromImage(img))
+        self.show_frame(frame)
         
-        res = self.get_result_str(result_lists)
+        res = self.get_result_str(result_lists, counts)
         self.signal.emit(res, 'res')
-        if hasattr(self, 'ssl_show'):
-            self.ssl_show.setText("检测已完成!")
+        self.signal.emit("检测已完成!", 'image')
 
+    # 滑块与数值框双向联动：同步对方的值时用 QSignalBlocker 屏蔽对方的 valueChanged，
+    # 避免两个回调来回互相触发；模型阈值在各自的回调中直接设置，始终取数值框的值
     def iou_change(self):
         value = self.hs_iou.value() / 100
-        self.dsb_iou.setValue(value)
+        with QtCore.QSignalBlocker(self.dsb_iou):
+            self.dsb_iou.setValue(value)
+        if self.detector is not None:
+            self.detector.set_iou(self.dsb_iou.value())
 
     def conf_change(self):
         value = self.hs_conf.value() / 100
-        self.dsb_conf.setValue(value)
+        with QtCore.QSignalBlocker(self.dsb_conf):
+            self.dsb_conf.setValue(value)
+        if self.detector is not None:
+            self.detector.set_confidence(self.dsb_conf.value())
 
     def dsb_iou_change(self):
-        value = int(self.dsb_iou.value() * 100)
-        self.hs_iou.setValue(value)
+        # round 而不是 int：0.29 * 100 = 28.999...，截断会让滑块停在 28
+        value = round(self.dsb_iou.value() * 100)
+        with QtCore.QSignalBlocker(self.hs_iou):
+            self.hs_iou.setValue(value)
         if self.detector is not None:
             self.detector.set_iou(self.dsb_iou.value())
 
     def dsb_conf_change(self):
-        value = int(self.dsb_conf.value() * 100)
-        self.hs_conf.setValue(value)
+        value = round(self.dsb_conf.value() * 100)
+        with QtCore.QSignalBlocker(self.hs_conf):
+            self.hs_conf.setValue(value)
         if self.detector is not None:
             self.detector.set_confidence(self.dsb_conf.value())
 
     def load_weights_to_list(self):
-        for file in os.listdir(self.weights_dir):
-            if file.endswith(".onnx") or file.endswith(".pt"):
-                self.cb_weights.addItem(file)
+        self.scan_weights()
+        # 一次添加全部条目，下拉框只刷新一次
+        self.cb_weights.addItems(list(self._weights_map))
 
-    def add_alarm_overlay(self, frame, result_lists):
-        if not result_lists:
-            return frame
-        
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        result_dict = {}
-        for result in result_lists:
-            name = result[0]
-            if name in result_dict.keys():
-                result_dict[name] += 1
+    # 扫描 weights_dir 下的 .onnx 和 .pt 文件（扩展名不区分大小写），目录没有变化（修改时间相同）时直接使用上次的结果
+    def scan_weights(self):
+        try:
+            mtime = os.stat(self.weights_dir).st_mtime
+        except OSError:
+            return
+        if mtime == self._weights_mtime:
+            return
+        # *.int8.onnx / *.fp16.onnx / *.opt.onnx / *_nms.onnx 是由原始模型派生的文件，检测器加载原始模型时会自动选用，
+        # 同目录下有对应的原始模型时不单独列出；只拷贝了派生文件时仍然列出，否则下拉框里找不到任何模型
+        # scandir 的目录项自带文件类型，is_file() 一般不需要额外的 stat；按文件名排序，列表顺序与文件系统无关
+        with os.scandir(self.weights_dir) as it:
+            entries = {entry.name: entry.path for entry in it
+                       if entry.is_file() and os.path.splitext(entry.name)[1].lower() in self.WEIGHTS_EXTS}
+        self._weights_map = {name: path for name, path in sorted(entries.items())
+                             if not self.has_base_weights(name, entries)}
+        self._weights_mtime = mtime
+
+    # 派生文件可能再派生，如 yolov5s.fp16.cuda.opt.onnx → yolov5s.fp16.onnx → yolov5s.onnx，
+    # 沿这条链向上，任何一级在 names 中时返回 True
+    @classmethod
+    def has_base_weights(cls, name, names):
+        while name.endswith(cls.DERIVED_WEIGHTS_SUFFIXES):
+            if name.endswith(".opt.onnx"):
+                # 优化缓存的文件名是 <模型>.<cpu|cuda>.opt.onnx
+                name = os.path.splitext(name[:-len(".opt.onnx")])[0] + ".onnx"
             else:
-                result_dict[name] = 1
-        
-        detection_items = []
-        for k, v in result_dict.items():
-            detection_items.append(f"{k}:{v}")
-        
-        result_summary = ", ".join(detection_items) if detection_items else "No detection"
-        alarm_text = f"{timestamp} ALARM: {result_summary}"
-        
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (0, 0), (overlay.shape[1], 50), (0, 0, 0), thickness=-1)
-        cv2.addWeighted(overlay, 0.6, frame, 0.4, 0, frame)
-        
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = 0.7
-        thickness = 2
-        color = (0, 0, 255)
-        
-        text_size = cv2.getTextSize(alarm_text, font, font_scale, thickness)[0]
-        max_width = frame.shape[1] - 20
-        
-        if text_size[0] > max_width:
-            lines = []
-            current_line = ""
-            words = alarm_text.split()
-            
-            for word in words:
-                test_line = current_line + (" " if current_line else "") + word
-                test_size = cv2.getTextSize(test_line, font, font_scale, thickness)[0]
-                if test_size[0] <= max_width:
-                    current_line = test_line
-                else:
-                    if current_line:
-                        lines.append(current_line)
-                    current_line = word
-            if current_line:
-                lines.append(current_line)
-            
-            # 绘制多行文本
-            y_offset = 25
-            for i, line in enumerate(lines[:2]):  # 最多显示2行
-                cv2.putText(frame, line, (10, y_offset + i * 25), font, font_scale, color, thickness, cv2.LINE_AA)
-        else:
-            # 单行显示
-            cv2.putText(frame, alarm_text, (10, 35), font, font_scale, color, thickness, cv2.LINE_AA)
-        
-        return frame
+                suffix = next(s for s in cls.DERIVED_WEIGHTS_SUFFIXES if name.endswith(s))
+                name = name[:-len(suffix)] + ".onnx"
+            if name in names:
+                return True
+        return False
+
+    def get_weights_path(self, name):
+        self.scan_weights()
+        return self._weights_map.get(name) or os.path.join(self.weights_dir, name)
+
+    # 静止画面判定用的缩略灰度图；INTER_AREA 缩小同时平滑了传感器噪声
+    def _static_thumb(self, frame):
+        return cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), self.STATIC_SIZE, interpolation=cv2.INTER_AREA)
+
+    # 两张缩略图都存在且差值总和小于阈值时认为画面没有变化
+    def _is_static(self, gray, prev_gray):
+        return gray is not None and prev_gray is not None and \
+            cv2.absdiff(gray, prev_gray).sum() < self.STATIC_SAD_THRESH
+
+    # 统计各类别的检测数量，Counter 的计数循环在 C 中完成，类别顺序为首次出现的顺序；
+    # 用 itemgetter 取类别名，不再为每个检测框执行一次生成器表达式
+    @staticmethod
+    def _count_classes(result_list):
+        return Counter(map(itemgetter(0), result_list))
+
+    def get_alarm_text(self, result_lists, counts=None):
+        # 告警条文字：时间戳 + 各类别数量，没有检测结果时不显示告警条
+        if not result_lists:
+            return None
+        result_dict = counts if counts is not None else self._count_classes(result_lists)
+        result_summary = ", ".join(f"{k}:{v}" for k, v in result_dict.items())
+        return f"{time.strftime('%Y-%m-%d %H:%M:%S')} ALARM: {result_summary}"
 
     def beautify_left_panel(self):
+        # 全部样式（含按对象名选择的左侧面板控件）放在窗口的一份样式表中，只设置、解析一次，
+        # 不再对单个控件调用 setStyleSheet
         self.setStyleSheet("""
             QMainWindow {
                 background-color: #f5f7fb;
@@ -955,6 +1281,8 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
                 min-height: 28px;
                 padding: 0 8px;
                 color: #1f2937;
+                font-size: 10pt;
+                font-weight: 500;
             }
             QPushButton:hover {
                 background-color: #eef4ff;
@@ -978,7 +1306,7 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
             QCheckBox {
                 spacing: 6px;
                 color: #2d3748;
-                font-size: 10pt;
+                font-size: 9pt;
             }
             QCheckBox::indicator {
                 width: 15px;
@@ -1000,25 +1328,28 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
             QMenuBar::item:selected {
                 background: #eef4ff;
             }
-        """)
-
-        label_font = "font-size:10pt; font-weight:600; color:#1f2937;"
-        self.label_2.setStyleSheet(label_font)
-        self.label_3.setStyleSheet(label_font)
-        self.label_4.setStyleSheet(label_font)
-        self.label_5.setStyleSheet(label_font)
-        self.le_res.setStyleSheet("font-size:10pt; padding:8px; background:#ffffff;")
-        self.picture.setStyleSheet("background:#0f172a; border:1px solid #d8dee9; border-radius:8px;")
-
-        self.btn_save_image.setStyleSheet("font-size:10pt; font-weight:500;")
-        self.btn_export_csv.setStyleSheet("font-size:10pt; font-weight:500;")
-        self.btn_export_report.setStyleSheet("font-size:10pt; font-weight:500;")
-        self.btn_export_json.setStyleSheet("font-size:10pt; font-weight:500;")
-        self.btn_clear_history.setStyleSheet("font-size:10pt; font-weight:500;")
+            QLabel#label_2, QLabel#label_3, QLabel#label_4, QLabel#label_5 {
+                font-size: 10pt;
+                font-weight: 600;
+                color: #1f2937;
+            }
+            QTextEdit#le_res {
+                font-size: 10pt;
+                padding: 8px;
+                background: #ffffff;
+            }
+            QLabel#picture {
+                background: #0f172a;
+                border: 1px solid #d8dee9;
+                border-radius: 8px;
+            }
+        """ + self.RECORD_COUNT_STYLE)
 
     def save_current_image(self):
         """保存当前检测图像"""
-        if self.current_frame is None:
+        # 取点击时的帧：检测循环可能仍在运行，弹出对话框期间 current_frame 会被替换成新的帧
+        frame = self.current_frame
+        if frame is None:
             QMessageBox.warning(self, "警告", "没有可保存的图像!")
             return
         
@@ -1035,64 +1366,86 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         )
         
         if filename:
-            try:
-                if not any(filename.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.bmp']):
-                    if 'JPEG' in selected_filter or 'jpg' in selected_filter.lower():
-                        if not filename.lower().endswith(('.jpg', '.jpeg')):
-                            filename += '.jpg'
-                    elif 'PNG' in selected_filter:
-                        if not filename.lower().endswith('.png'):
-                            filename += '.png'
-                    elif 'BMP' in selected_filter:
-                        if not filename.lower().endswith('.bmp'):
-                            filename += '.bmp'
-                    else:
+            if not any(filename.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.bmp']):
+                if 'JPEG' in selected_filter or 'jpg' in selected_filter.lower():
+                    if not filename.lower().endswith(('.jpg', '.jpeg')):
                         filename += '.jpg'
-                
-                save_dir = os.path.dirname(filename)
-                if save_dir and not os.path.exists(save_dir):
-                    os.makedirs(save_dir, exist_ok=True)
-                
-                success = cv2.imwrite(filename, self.current_frame)
-                if success:
-                    QMessageBox.information(self, "成功", f"图像已保存到:\n{filename}")
+                elif 'PNG' in selected_filter:
+                    if not filename.lower().endswith('.png'):
+                        filename += '.png'
+                elif 'BMP' in selected_filter:
+                    if not filename.lower().endswith('.bmp'):
+                        filename += '.bmp'
                 else:
-                    QMessageBox.warning(self, "错误", f"保存图像失败!\n请检查文件路径和权限。")
-            except Exception as e:
-                QMessageBox.critical(self, "错误", f"保存图像时发生错误:\n{str(e)}")
+                    filename += '.jpg'
+            # 编码和写文件在后台线程中完成，大图保存为 PNG 时界面也不会卡住
+            self.run_io(lambda: self._write_image(filename, frame), "保存图像时发生错误")
     
+    # 后台线程中执行：先编码再一次写入文件；cv2.imwrite 不支持 Windows 下的中文路径，open 没有这个问题
+    @staticmethod
+    def _write_image(filename, frame):
+        save_dir = os.path.dirname(filename)
+        if save_dir and not os.path.exists(save_dir):
+            os.makedirs(save_dir, exist_ok=True)
+        success, buf = cv2.imencode(os.path.splitext(filename)[1], frame)
+        if not success:
+            return 'warning', "错误", "保存图像失败!\n请检查文件路径和权限。"
+        with open(filename, 'wb') as f:
+            f.write(buf)
+        return 'information', "成功", f"图像已保存到:\n{filename}"
+
+    # =========================================================================
+    # run_io / on_io_done - 后台保存/导出
+    # =========================================================================
+    # job 在 _io_pool 线程中执行，返回 (QMessageBox 方法名, 标题, 提示文字)，由主线程的 on_io_done 弹出；
+    # job 抛出异常时以 "error_text: 异常信息" 弹出错误框。编码图像、遍历检测记录写文件都不阻塞界面。
+    def run_io(self, job, error_text):
+        def task():
+            try:
+                level, title, text = job()
+            except Exception as e:
+                level, title, text = 'critical', "错误", f"{error_text}:\n{str(e)}"
+            self.io_signal.emit(level, title, text)
+        self._io_pool.submit(task)
+
+    def on_io_done(self, level, title, text):
+        getattr(QMessageBox, level)(self, title, text)
+
+    # 导出检测记录：export 为 PostProcessor 的导出方法，what 为提示文字中的导出内容名称
+    def _export_job(self, export, filename, what):
+        # 条数取自导出时的快照，导出期间继续检测或清空记录不影响提示
+        filepath, count = export(filename)
+        return 'information', "成功", f"{what}已导出到:\n{filepath}\n\n共导出 {count} 条检测记录"
+
     def export_report(self):
-        if not self.post_processor.detection_history:
+        if len(self.post_processor) == 0:
             QMessageBox.warning(self, "警告", "没有检测记录可导出!\n请先进行检测操作。")
             return
         default_filename = os.path.join(self.post_processor.output_dir, 
                                        f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
         filename, _ = QFileDialog.getSaveFileName(self, "导出报告", default_filename, "文本文件 (*.txt)")
         if filename:
-            filepath = self.post_processor.export_report(filename)
-            QMessageBox.information(self, "成功", f"报告已导出到:\n{filepath}\n\n共导出 {len(self.post_processor.detection_history)} 条检测记录")
+            self.run_io(lambda: self._export_job(self.post_processor.export_report, filename, "报告"), "导出报告失败")
     
     def export_csv(self):
-        if not self.post_processor.detection_history:
+        if len(self.post_processor) == 0:
             QMessageBox.warning(self, "警告", "没有检测记录可导出!\n请先进行检测操作。")
             return
         default_filename = os.path.join(self.post_processor.output_dir, 
                                        f"detections_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
         filename, _ = QFileDialog.getSaveFileName(self, "导出CSV", default_filename, "CSV文件 (*.csv)")
         if filename:
-            filepath = self.post_processor.export_csv(filename)
-            QMessageBox.information(self, "成功", f"CSV已导出到:\n{filepath}\n\n共导出 {len(self.post_processor.detection_history)} 条检测记录")
+            self.run_io(lambda: self._export_job(self.post_processor.export_csv, filename, "CSV"), "导出CSV失败")
     
     def export_json(self):
-        if not self.post_processor.detection_history:
+        if len(self.post_processor) == 0:
             QMessageBox.warning(self, "警告", "没有检测记录可导出!\n请先进行检测操作。")
             return
         default_filename = os.path.join(self.post_processor.output_dir, 
                                        f"detections_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
         filename, _ = QFileDialog.getSaveFileName(self, "导出JSON", default_filename, "JSON文件 (*.json)")
         if filename:
-            filepath = self.post_processor.export_json(filename)
-            QMessageBox.information(self, "成功", f"JSON已导出到:\n{filepath}\n\n共导出 {len(self.post_processor.detection_history)} 条检测记录")
+            self.run_io(lambda: self._export_job(self.post_processor.export_json, filename, "JSON"), "导出JSON失败")
     
     def clear_history(self):
         reply = QMessageBox.question(self, "确认", "确定要清空所有检测记录吗?", 
@@ -1100,12 +1453,16 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         if reply == QMessageBox.Yes:
             self.post_processor.clear_history()
             self.le_res.clear()
+            self._last_res = None
             self.update_record_count()
             QMessageBox.information(self, "成功", "检测记录已清空!")
     
     def toggle_enhancement(self, state):
         self.video_processor.enable_enhancement = (state == QtCore.Qt.Checked)
     
+    def toggle_skip_static(self, state):
+        self.skip_static = (state == QtCore.Qt.Checked)
+    
     def retranslateUi(self):
         _translate = QtCore.QCoreApplication.translate
         self.setWindowTitle(_translate("MainWindow", "基于深度学习的皮带传送带锚杆检测系统"))
@@ -4,14 +4,85 @@
 支持多种深度学习模型格式（ONNX、PyTorch等）
 """
 from abc import ABC, abstractmethod
+from functools import lru_cache
+import threading
 import numpy as np
 import cv2
 from typing import List, Tuple, Optional
 
 
+def _cpu_supports_vnni() -> bool:
+    """
+    CPU 是否支持 VNNI 指令（int8 点积），不支持时 int8 模型不比 fp32 快
+    
+    安装了 py-cpuinfo 时用它读取 CPU 标志；否则在 Linux 上读 /proc/cpuinfo。
+    其他系统（Windows、macOS）退回 numpy 运行时检测的 CPU 特性，numpy 只检测 AVX512-VNNI，
+    只有 256 位 AVX-VNNI 的 CPU（如 Alder Lake 的大小核）在这里会判为不支持
+    """
+    try:
+        import cpuinfo
+        flags = cpuinfo.get_cpu_info().get('flags', [])
+    except ImportError:
+        try:
+            with open('/proc/cpuinfo') as f:
+                flags = f.read().split()
+        except OSError:
+            try:
+                from numpy._core._multiarray_umath import __cpu_features__
+            except ImportError:
+                try:  # numpy 1.x
+                    from numpy.core._multiarray_umath import __cpu_features__
+                except ImportError:  # numpy 1.20 之前没有 __cpu_features__
+                    return False
+            return __cpu_features__.get('AVX512VNNI', False)
+    return 'avx512_vnni' in flags or 'avx_vnni' in flags
+
+
+@lru_cache(maxsize=1024)
+def _text_size(text: str, scale: float, thickness: int) -> Tuple[int, int]:
+    """告警条文字的像素宽高（FONT_HERSHEY_SIMPLEX），相同文字只测量一次；
+    文字带时间戳，每秒变化一次，缓存大小有上限，旧的条目会被淘汰"""
+    return cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)[0]
+
+
+# FONT_HERSHEY_SIMPLEX 中所有数字的宽度相同，把数字都换成 0 后文字宽度不变
+_DIGITS_TO_ZERO = str.maketrans('123456789', '000000000')
+
+
+@lru_cache(maxsize=256)
+def _alarm_layout(pattern: str, max_width: int, scale: float, thickness: int) -> Optional[Tuple[Tuple[int, int], ...]]:
+    """
+    告警条文字的换行方式，按单词换行，最多2行
+    
+    告警文字只有时间戳和数量在变，且都是数字；pattern 是把数字换成 0 后的文字，
+    同一组类别的告警条只需计算一次换行
+    
+    Returns:
+        一行能放下时返回 None，否则返回每行的单词下标范围 (start, end)
+    """
+    if _text_size(pattern, scale, thickness)[0] <= max_width:
+        return None
+    spans = []
+    words = pattern.split()
+    start = 0
+    for i in range(1, len(words)):
+        if _text_size(' '.join(words[start:i + 1]), scale, thickness)[0] > max_width:
+            spans.append((start, i))
+            start = i
+    spans.append((start, len(words)))
+    return tuple(spans[:2])
+
+
 class BaseDetector(ABC):
     """检测器基类，定义通用接口"""
     
+    # 顶部告警条文字样式
+    _ALARM_FONT = cv2.FONT_HERSHEY_SIMPLEX
+    _ALARM_SCALE = 0.7
+    _ALARM_THICK = 2
+    _ALARM_LINETYPE = cv2.LINE_8  # 压暗底条上的小号文字看不出抗锯齿差别，LINE_8 约快一倍
+    _ALARM_COLOR = (0, 0, 255)
+    
     def __init__(self, weights: str, names: Optional[List[str]] = None, conf_thres: float = 0.45, iou_thres: float = 0.45):
         """
         初始化检测器
@@ -27,6 +98,11 @@ class BaseDetector(ABC):
         self.confidence = conf_thres
         self.iou = iou_thres
         self.img_size = (640, 640)  # 默认输入尺寸
+        self._text_size_cache = {}  # (数字换成 0 的标签文字, 线宽) → cv2.getTextSize 结果
+        self.alarm_antialias = False  # 为 True 时告警文字改用 LINE_AA 绘制
+        self.batch_size = 4  # 视频检测时每次送入模型的帧数，tune_batch_size() 按实测耗时调整
+        # 推理复用输入缓冲区和 IOBinding，不能由两个线程同时进行；预热和检测循环调用推理时都要持有
+        self.lock = threading.Lock()
         
     @abstractmethod
     def load_model(self):
@@ -46,9 +122,52 @@ class BaseDetector(ABC):
         """
         pass
     
+    def inference_image_batch(self, images: List[np.ndarray]) -> List[List[List]]:
+        """
+        对多张图像进行推理，默认逐张调用 inference_image，支持批量推理的检测器可重写
+        
+        Args:
+            images: 输入图像列表 (BGR格式)
+            
+        Returns:
+            每张图像一个检测结果列表，格式同 inference_image
+        """
+        return [self.inference_image(image) for image in images]
+    
+    def tune_batch_size(self, candidates: Tuple[int, ...] = (1, 2, 4, 8), tolerance: float = 0.05) -> int:
+        """
+        用空白图像实测各个 batch 大小的单帧耗时，选出视频检测使用的 batch_size
+        
+        batch 增大到一定程度后吞吐量不再提高（CPU 上几乎不随 batch 变化），
+        取单帧耗时不超过最优值 (1 + tolerance) 倍的最小 batch，攒帧的延迟和内存占用都更小
+        
+        Args:
+            candidates: 候选的 batch 大小，不应超过检测器支持的最大 batch
+            tolerance: 允许比最短单帧耗时慢的比例
+            
+        Returns:
+            选定的 batch 大小，同时保存到 self.batch_size
+        """
+        import time
+        
+        image = np.zeros((*self.img_size, 3), dtype=np.uint8)
+        per_frame = {}
+        for n in candidates:
+            images = [image] * n
+            self.inference_image_batch(images)  # 第一次运行包含该 batch 形状的初始化，不计时
+            t0 = time.perf_counter()
+            self.inference_image_batch(images)
+            per_frame[n] = (time.perf_counter() - t0) / n
+        best = min(per_frame.values())
+        self.batch_size = min(n for n, t in per_frame.items() if t <= best * (1 + tolerance))
+        return self.batch_size
+    
     def preprocess(self, image: np.ndarray) -> Tuple[np.ndarray, Tuple, Tuple]:
         """
-        图像预处理（通用）
+        图像预处理（通用），结果与 letterbox(auto=False) 相同
+        
+        尺寸已等于 img_size 时直接返回输入图像（不复制）；宽高比一致、缩放后不需要边框时只做一次 resize，
+        都不再经过 copyMakeBorder
         
         Args:
             image: 输入图像
@@ -57,6 +176,14 @@ class BaseDetector(ABC):
             处理后的图像, 缩放比例, 填充大小
         """
         from yolov5_utils import letterbox
+        
+        h, w = image.shape[:2]
+        new_h, new_w = self.img_size
+        if (h, w) == (new_h, new_w):
+            return image, (1.0, 1.0), (0.0, 0.0)
+        r = min(new_h / h, new_w / w)
+        if (int(round(w * r)), int(round(h * r))) == (new_w, new_h):
+            return cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR), (r, r), (0.0, 0.0)
         return letterbox(image, self.img_size, stride=64, auto=False)
     
     def draw_image(self, result_list: List[List], opencv_img: np.ndarray) -> np.ndarray:
@@ -73,11 +200,11 @@ class BaseDetector(ABC):
         if len(result_list) == 0:
             return opencv_img
         
-        for result in result_list:
-            label_text = f"{result[0]}, {result[1]:.2f}"
-            opencv_img = self._draw_box(opencv_img, 
-                                       [result[2], result[3], result[4], result[5]], 
-                                       label_text)
+        # 线宽只与图像尺寸有关，每帧计算一次
+        lw = max(round(sum(opencv_img.shape) / 2 * 0.003), 2)
+        draw_box = self._draw_box
+        for name, conf, x1, y1, x2, y2 in result_list:
+            draw_box(opencv_img, (x1, y1, x2, y2), f"{name}, {conf:.2f}", line_width=lw)
         return opencv_img
     
     def _draw_box(self, img: np.ndarray, box: List[int], label: str = '', 
@@ -92,7 +219,11 @@ class BaseDetector(ABC):
         
         if label:
             tf = max(lw - 1, 1)
-            w, h = cv2.getTextSize(label, 0, fontScale=lw / 3, thickness=tf)[0]
+            # 字体 0（FONT_HERSHEY_SIMPLEX）中数字等宽，置信度不同的标签尺寸相同，每个类别只测量一次
+            key = (label.translate(_DIGITS_TO_ZERO), lw)
+            if key not in self._text_size_cache:
+                self._text_size_cache[key] = cv2.getTextSize(label, 0, fontScale=lw / 3, thickness=tf)[0]
+            w, h = self._text_size_cache[key]
             outside = p1[1] - h - 3 >= 0
             p2 = p1[0] + w, p1[1] - h - 3 if outside else p1[1] + h + 3
             cv2.rectangle(img, p1, p2, txt_box_color, -1, cv2.LINE_AA)
@@ -100,6 +231,47 @@ class BaseDetector(ABC):
                        0, lw / 3, txt_color, thickness=tf, lineType=cv2.LINE_AA)
         return img
     
+    def render_annotations(self, frame: np.ndarray, result_list: List[List],
+                           alarm_text: Optional[str] = None) -> np.ndarray:
+        """
+        在图像上一次性绘制检测框、标签和顶部告警条，全部原地修改 frame
+        
+        告警条只对顶部 0~50 行做半透明压暗，不再整帧拷贝和整帧混合；
+        换行方式按类别组合缓存（见 _alarm_layout），每帧只绘制文字
+        
+        Args:
+            frame: 原始图像 (BGR格式)，会被直接修改
+            result_list: 检测结果列表
+            alarm_text: 告警条文字，为 None 时不绘制告警条
+            
+        Returns:
+            绘制完成的图像（即 frame 本身）
+        """
+        self.draw_image(result_list, frame)
+        if alarm_text is None:
+            return frame
+        
+        # 黑色底条以 0.6 的不透明度叠加：只需把顶部区域按 0.4 原地缩放，不需要黑色底图
+        bar = frame[:51]  # 与 cv2.rectangle((0, 0), (w, 50)) 覆盖的行一致
+        cv2.convertScaleAbs(bar, bar, alpha=0.4)
+        
+        line_type = cv2.LINE_AA if self.alarm_antialias else self._ALARM_LINETYPE
+        max_width = frame.shape[1] - 20
+        
+        spans = _alarm_layout(alarm_text.translate(_DIGITS_TO_ZERO), max_width, self._ALARM_SCALE, self._ALARM_THICK)
+        if spans is None:
+            # 单行显示
+            cv2.putText(frame, alarm_text, (10, 35), self._ALARM_FONT, self._ALARM_SCALE, self._ALARM_COLOR,
+                        self._ALARM_THICK, line_type)
+            return frame
+        
+        # 按缓存的换行方式绘制多行文本
+        words = alarm_text.split()
+        for i, (start, end) in enumerate(spans):
+            cv2.putText(frame, ' '.join(words[start:end]), (10, 25 + i * 25), self._ALARM_FONT, self._ALARM_SCALE,
+                        self._ALARM_COLOR, self._ALARM_THICK, line_type)
+        return frame
+    
     def set_confidence(self, conf: float):
         """设置置信度阈值"""
         self.confidence = conf
@@ -112,31 +284,95 @@ class BaseDetector(ABC):
 class YOLOv5ONNXDetector(BaseDetector):
     """YOLOv5 ONNX模型检测器"""
     
-    def __init__(self, weights: str, names: Optional[List[str]] = None, conf_thres: float = 0.45, iou_thres: float = 0.45):
+    max_batch = 8  # TensorRT 引擎支持的最大 batch，需不小于界面的 video_batch_size
+    
+    def __init__(self, weights: str, names: Optional[List[str]] = None, conf_thres: float = 0.45, iou_thres: float = 0.45,
+                 int8: bool = False):
+        """
+        Args:
+            int8: 在 CPU 上运行且没有现成的 *.int8.onnx 时，用 quantize_dynamic 生成 int8 模型；
+                  加载时与 fp32 模型各测一次耗时，int8 不更快时仍使用 fp32
+        """
         super().__init__(weights, names, conf_thres, iou_thres)
+        self.int8 = int8
         self.sess = None
         self.input_name = None
         self.output_name = None
+        self.output_names = None  # sess.run 取回的输出；融合了 NMS 的模型有 4 个输出
+        self.end2end = False  # 模型内已完成 NMS（输出 num_dets, boxes, scores, classes）
         self.device = 'cpu'
+        self._batch_buf = None  # 批量推理的输入缓冲区，按需扩容后复用
+        self._input_buf = np.empty((1, 3, *self.img_size), dtype=np.float32)  # 单张推理的输入缓冲区
+        self._input_dtype = np.float32  # 模型输入类型，fp16 模型为 np.float16
+        self._gpu_preprocess = False  # 在 CUDA 上推理且 torch 可以使用 GPU 时，预处理也在显存中完成
+        self._cpu_bindings = {}  # batch 大小 → (IOBinding, 绑定为输出的 numpy 数组)
+        self._gpu_bindings = {}  # batch 大小 → [显存中的输入 tensor, IOBinding, 页锁定的输出 tensor, RunOptions]
+        self._cuda_graph = False  # CUDA 执行器开启了 CUDA Graph，每个 batch 大小捕获一张图后重放
+        self._gpu_frames = {}  # batch 中的位置 → (页锁定内存, 显存) 中的原始 uint8 帧，帧尺寸变化时重新分配
+        self._stream = None  # GPU 预处理专用的 CUDA stream
         self.load_model()
     
     def load_model(self):
         """加载ONNX模型"""
+        import os
         import onnxruntime
-        import torch
-        
-        cuda = torch.cuda.is_available()
-        self.device = 'cuda' if cuda else 'cpu'
-        providers = ['CUDAExecutionProvider', 'CPUExecutionProvider'] if cuda else ['CPUExecutionProvider']
         
-        print(f'正在加载ONNX模型: {self.weights}')
-        self.sess = onnxruntime.InferenceSession(self.weights, providers=providers)
+        # 按 TensorRT → CUDA → DirectML → CPU 的顺序选择当前 onnxruntime 可用的执行器。
+        # onnxruntime-gpu 总会列出 TensorRT/CUDA，缺少对应运行库（TensorRT、cuDNN 等）时创建会话不报错，
+        # 而是悄悄退回下一个执行器；这时按首选执行器挑选的模型和选项（_nms.onnx、fp16 模型、CUDA Graph）
+        # 都不再适用，所以以会话实际使用的执行器为准，首选的没有生效时去掉它重新选择模型和选项
+        available = onnxruntime.get_available_providers()
+        candidates = [p for p in ('TensorrtExecutionProvider', 'CUDAExecutionProvider', 'DmlExecutionProvider')
+                      if p in available]
+        allow_cuda_graph = True
+        while True:
+            providers, model_path, cuda_graph = self._session_plan(candidates, allow_cuda_graph)
+            first = candidates[0] if candidates else 'CPUExecutionProvider'
+            print(f'正在加载ONNX模型: {model_path}')
+            try:
+                self.sess = self._create_session(model_path, providers)
+            except Exception as e:
+                if cuda_graph:
+                    # 有节点不在 CUDA 执行器上时 onnxruntime 拒绝开启 CUDA Graph，改为逐个 kernel 启动
+                    print(f'无法启用 CUDA Graph，按普通方式推理: {e}')
+                    allow_cuda_graph = False
+                    continue
+                if not candidates:
+                    raise
+                print(f'{first} 无法加载模型，改用其他执行器: {e}')
+                candidates = candidates[1:]
+                continue
+            if self.sess.get_providers()[0] != first:
+                print(f'{first} 未能启用（缺少运行库？），改用其他执行器')
+                candidates = candidates[1:]
+                continue
+            break
+        self._cuda_graph = cuda_graph
+        gpu = self.sess.get_providers()[0] != 'CPUExecutionProvider'
+        if self.int8 and not gpu and model_path == self.weights:
+            try:
+                self._try_dynamic_int8(providers)
+            except Exception as e:
+                # onnxruntime.quantization 依赖可选的 onnx 包；量化或 int8 会话失败时 self.sess 仍是 fp32 模型
+                print(f'int8量化失败，继续使用fp32模型: {e}')
+        self.device = {'TensorrtExecutionProvider': 'cuda', 'CUDAExecutionProvider': 'cuda',
+                       'DmlExecutionProvider': 'dml'}.get(self.sess.get_providers()[0], 'cpu')
         self.output_name = self.sess.get_outputs()[0].name
+        self.end2end = self.output_name == 'num_dets'
+        self.output_names = [o.name for o in self.sess.get_outputs()] if self.end2end else [self.output_name]
         self.input_name = self.sess.get_inputs()[0].name
+        self._input_dtype = np.float16 if self.sess.get_inputs()[0].type == 'tensor(float16)' else np.float32
+        if self.device == 'cuda':
+            import torch
+            self._gpu_preprocess = torch.cuda.is_available()
+            if self._gpu_preprocess:
+                # 预处理使用自己的 stream，不和其他线程在默认 stream 上的 torch 操作串行排队
+                self._stream = torch.cuda.Stream()
+        self._cpu_bindings = {}
+        self._gpu_bindings = {}
         
         # 加载类别名称
         if not self.names:
-            import os
             names_file = os.path.join(os.path.dirname(self.weights), 'class_names.txt')
             if os.path.exists(names_file):
                 with open(names_file, 'r', encoding='utf-8') as f:
@@ -145,46 +381,340 @@ class YOLOv5ONNXDetector(BaseDetector):
         # Warm up
         dummy_img = np.zeros((300, 300, 3), dtype=np.uint8)
         self.inference_image(dummy_img)
+        if not self.end2end:
+            import nms_numpy
+            nms_numpy.warmup()
         print('模型加载完成!')
     
+    def _session_plan(self, candidates: List[str], allow_cuda_graph: bool = True) -> Tuple[list, str, bool]:
+        """
+        按候选的 GPU 执行器（首选的在前）确定 InferenceSession 的 providers 和要加载的模型文件
+        
+        同目录下有 Yolov5OnnxruntimeDet.to_fp16() / quantize() 生成的模型时优先使用：
+        GPU 上用 fp16，支持 VNNI 的 CPU 上用 int8，self.weights 仍是用户选择的原始权重。
+        TensorRT 直接用原始 fp32 模型，由 trt_fp16_enable 在构建引擎时转为 fp16；
+        有图内融合了 EfficientNMS_TRT 的 <权重名>_nms.onnx 时改用它，解码和 NMS 都在引擎内完成
+        
+        Returns:
+            providers, 模型路径, 是否开启了 CUDA Graph
+        """
+        import os
+        import onnxruntime
+        
+        first = candidates[0] if candidates else 'CPUExecutionProvider'
+        providers = list(candidates)
+        cuda_graph = False
+        if 'CUDAExecutionProvider' in providers:
+            cuda_options = {
+                # 每个 batch 形状只在第一次运行时搜索卷积算法，tune_batch_size 预热时已覆盖常用形状
+                'cudnn_conv_algo_search': 'EXHAUSTIVE',
+                # 输入尺寸固定，显存池按实际请求增长，不按 2 的幂次多占显存
+                'arena_extend_strategy': 'kSameAsRequested',
+                'do_copy_in_default_stream': '1',
+            }
+            # 模型输入固定为 img_size，CUDA Graph 把每次推理的数百次 kernel 启动合并为一次图重放；
+            # 要求输入输出绑定在地址不变的显存上，只有 GPU 预处理路径（需要 torch 的 CUDA）满足，
+            # 按 batch 大小区分多张图的 gpu_graph_id 需要 onnxruntime 1.18 以上
+            if (first == 'CUDAExecutionProvider' and allow_cuda_graph
+                    and tuple(int(v) for v in onnxruntime.__version__.split('.')[:2]) >= (1, 18)):
+                import torch
+                cuda_graph = torch.cuda.is_available()
+            if cuda_graph:
+                cuda_options['enable_cuda_graph'] = '1'
+            providers[providers.index('CUDAExecutionProvider')] = ('CUDAExecutionProvider', cuda_options)
+        providers.append('CPUExecutionProvider')
+        
+        model_path = self.weights
+        stem = os.path.splitext(self.weights)[0]
+        if first == 'TensorrtExecutionProvider':
+            # fp16 引擎缓存到权重目录下的 trt_cache（onnxruntime 按模型内容区分），只在第一次加载时构建
+            shape = 'images:{}x3x%dx%d' % self.img_size  # yolov5 导出的输入名为 images
+            providers[0] = ('TensorrtExecutionProvider', {
+                'trt_fp16_enable': '1',
+                'trt_engine_cache_enable': '1',
+                'trt_engine_cache_path': os.path.join(os.path.dirname(self.weights) or '.', 'trt_cache'),
+                # 输入固定 640x640，batch 在 1~max_batch 之间，只构建一个引擎
+                'trt_profile_min_shapes': shape.format(1),
+                'trt_profile_opt_shapes': shape.format(1),
+                'trt_profile_max_shapes': shape.format(self.max_batch),
+            })
+            if os.path.exists(stem + '_nms.onnx'):
+                model_path = stem + '_nms.onnx'
+        elif first != 'CPUExecutionProvider' and os.path.exists(stem + '.fp16.onnx'):
+            model_path = stem + '.fp16.onnx'
+        elif first == 'CPUExecutionProvider' and os.path.exists(stem + '.int8.onnx') and _cpu_supports_vnni():
+            model_path = stem + '.int8.onnx'
+        return providers, model_path, cuda_graph
+    
+    @staticmethod
+    def _create_session(model_path: str, providers: list):
+        """
+        开启全部图优化创建 InferenceSession
+        
+        CPU / CUDA 上把优化后的模型保存为 <模型名>.<cpu|cuda>.opt.onnx（融合后的算子与执行设备相关），
+        之后加载时直接读取，跳过图优化；TensorRT 接管的子图无法序列化，由它自己的引擎缓存加速启动
+        """
+        import os
+        import onnxruntime
+        
+        first = providers[0] if isinstance(providers[0], str) else providers[0][0]
+        so = onnxruntime.SessionOptions()
+        so.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        so.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if first == 'DmlExecutionProvider':
+            # DirectML 不支持内存复用模式
+            so.enable_mem_pattern = False
+            return onnxruntime.InferenceSession(model_path, sess_options=so, providers=providers)
+        if first == 'TensorrtExecutionProvider':
+            return onnxruntime.InferenceSession(model_path, sess_options=so, providers=providers)
+        
+        device = 'cuda' if first == 'CUDAExecutionProvider' else 'cpu'
+        opt_path = '%s.%s.opt.onnx' % (os.path.splitext(model_path)[0], device)
+        if os.path.exists(opt_path) and os.path.getmtime(opt_path) >= os.path.getmtime(model_path):
+            so.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+            try:
+                return onnxruntime.InferenceSession(opt_path, sess_options=so, providers=providers)
+            except Exception as e:  # 缓存损坏或由不兼容的 onnxruntime 版本生成时重新优化
+                print(f'优化模型缓存不可用，重新优化: {e}')
+                so.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        so.optimized_model_filepath = opt_path
+        return onnxruntime.InferenceSession(model_path, sess_options=so, providers=providers)
+    
+    def _try_dynamic_int8(self, providers):
+        """
+        用 quantize_dynamic 得到的 int8 模型替换 self.sess（只在更快时替换）
+        
+        量化结果缓存在权重目录下的 quant/ 中，原始模型更新后重新生成。
+        卷积为主的模型动态量化后常常反而更慢（激活值每次推理都要重新量化），
+        所以两个模型各用一张空白输入跑几次，取最短耗时比较
+        """
+        import os
+        import time
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        
+        quant_dir = os.path.join(os.path.dirname(self.weights) or '.', 'quant')
+        int8_path = os.path.join(quant_dir, os.path.splitext(os.path.basename(self.weights))[0] + '.int8.onnx')
+        if not os.path.exists(int8_path) or os.path.getmtime(int8_path) < os.path.getmtime(self.weights):
+            os.makedirs(quant_dir, exist_ok=True)
+            print(f'正在量化ONNX模型: {int8_path}')
+            quantize_dynamic(self.weights, int8_path, weight_type=QuantType.QInt8)
+        int8_sess = self._create_session(int8_path, providers)
+        
+        blob = np.zeros((1, 3, *self.img_size), dtype=np.float32)
+        
+        def best_time(sess):
+            feed = {sess.get_inputs()[0].name: blob}
+            sess.run(None, feed)  # 第一次推理包含初始化，不计时
+            times = []
+            for _ in range(3):
+                t0 = time.perf_counter()
+                sess.run(None, feed)
+                times.append(time.perf_counter() - t0)
+            return min(times)
+        
+        fp32_time, int8_time = best_time(self.sess), best_time(int8_sess)
+        if int8_time < fp32_time:
+            self.sess = int8_sess
+            print(f'使用int8模型: {int8_time * 1000:.1f} ms（fp32 {fp32_time * 1000:.1f} ms）')
+        else:
+            print(f'int8模型没有更快（{int8_time * 1000:.1f} ms，fp32 {fp32_time * 1000:.1f} ms），继续使用fp32模型')
+    
     def inference_image(self, image: np.ndarray) -> List[List]:
         """推理单张图像"""
-        import torch
-        from yolov5_utils import non_max_suppression, scale_coords
-        
-        # 预处理
-        img, ratio, pad = self.preprocess(image)
-        img = img.transpose((2, 0, 1))[::-1]  # HWC转CHW，BGR转RGB
-        img = np.ascontiguousarray(img)
-        img = torch.from_numpy(img).to(self.device)
-        img = img.float()
-        img /= 255
-        if len(img.shape) == 3:
-            img = img[None]
-        
-        # 推理
-        img_np = img.cpu().numpy()
-        pred_onnx = torch.tensor(self.sess.run([self.output_name], {self.input_name: img_np})[0])
+        from fast_preprocess import preprocess_into
+        
+        if self._gpu_preprocess:
+            outputs = self._run_gpu([image])
+        else:
+            # 预处理：letterbox、BGR转RGB、HWC转CHW、归一化一次写入输入缓冲区
+            img = self._input_buf
+            preprocess_into(image, img[0])
+            
+            # 推理
+            outputs = self._run(img)
         
         # NMS
-        pred = non_max_suppression(pred_onnx, self.confidence, self.iou, classes=None, agnostic=False, max_det=1000)
+        pred = self._nms(outputs)
         
         # 转换结果
         result_list = []
         for i, det in enumerate(pred):
             if len(det):
-                det[:, :4] = scale_coords(img.shape[2:], det[:, :4], image.shape).round()
-                for *xyxy, conf, cls in reversed(det):
-                    xyxy = (torch.tensor(xyxy).view(1, 4)).view(-1)
-                    cls_name = self.names[int(cls)] if int(cls) < len(self.names) else f"class_{int(cls)}"
-                    result_list.append([
-                        cls_name,
-                        round(float(conf), 2),
-                        int(xyxy[0]), int(xyxy[1]),
-                        int(xyxy[2]), int(xyxy[3])
-                    ])
+                result_list.extend(self._det_to_list(det, self.img_size, image.shape))
         
         return result_list
+    
+    def inference_image_batch(self, images: List[np.ndarray]) -> List[List[List]]:
+        """多张图像拼成一个 batch，只调用一次 sess.run，NMS 也对整个 batch 一次完成"""
+        from fast_preprocess import preprocess_into
+        
+        if self._gpu_preprocess:
+            outputs = self._run_gpu(images)
+        else:
+            n = len(images)
+            if self._batch_buf is None or len(self._batch_buf) < n:
+                self._batch_buf = np.empty((n, 3, *self.img_size), dtype=np.float32)
+            batch = self._batch_buf[:n]
+            for i, image in enumerate(images):
+                preprocess_into(image, batch[i])
+            outputs = self._run(batch)
+        pred = self._nms(outputs)
+        return [self._det_to_list(det, self.img_size, image.shape) if len(det) else []
+                for det, image in zip(pred, images)]
+    
+    def _run(self, blob: np.ndarray) -> List[np.ndarray]:
+        """
+        执行推理，fp16 模型的输入在这里转换类型，返回 output_names 对应的输出
+        
+        CPU 上每个 batch 大小第一次推理后，把这次的输出数组绑定为 IOBinding 的输出，之后 onnxruntime 直接写入它，
+        不再每帧分配数 MB 的输出；输入也直接绑定 blob 的内存。返回的数组下一次推理时会被覆盖
+        """
+        if self._input_dtype != np.float32:
+            blob = blob.astype(self._input_dtype)
+        if self.device != 'cpu' or self.end2end:
+            return self.sess.run(self.output_names, {self.input_name: blob})
+        n = len(blob)
+        if n not in self._cpu_bindings:
+            import onnxruntime
+            out = self.sess.run(self.output_names, {self.input_name: blob})[0]
+            binding = self.sess.io_binding()
+            binding.bind_ortvalue_output(self.output_name, onnxruntime.OrtValue.ortvalue_from_numpy(out))
+            self._cpu_bindings[n] = binding, out
+            return [out]
+        binding, out = self._cpu_bindings[n]
+        binding.bind_cpu_input(self.input_name, blob)
+        self.sess.run_with_iobinding(binding)
+        return [out]
+    
+    def _nms(self, outputs: List[np.ndarray]) -> List[np.ndarray]:
+        """
+        把模型输出整理成每张图像一个 (n, 6) 数组 [xyxy, conf, cls]
+        
+        普通模型在这里用 nms_numpy 做 NMS，直接处理 numpy 输出，不经过 torch；
+        融合了 NMS 的模型已在引擎内完成，只按置信度阈值过滤（IoU 阈值在导出模型时已固定）
+        """
+        from nms_numpy import non_max_suppression
+        
+        if not self.end2end:
+            # 半精度模型的输出先转回 fp32
+            return non_max_suppression(outputs[0].astype(np.float32, copy=False), self.confidence, self.iou,
+                                       max_det=1000)
+        num_dets, boxes, scores, classes = outputs
+        pred = []
+        for n, box, score, cls in zip(num_dets.reshape(-1), boxes, scores, classes):
+            det = np.concatenate((box[:n], score[:n, None], cls[:n, None]), 1).astype(np.float32)
+            pred.append(det[det[:, 4] >= self.confidence])
+        return pred
+    
+    def _run_gpu(self, images: List[np.ndarray]) -> List[np.ndarray]:
+        """
+        GPU 上预处理并推理：只上传原始 uint8 帧，预处理结果直接写入绑定给 onnxruntime 的显存，
+        不再在 CPU 上生成 float 输入再整块拷贝到 GPU；输出拷回 CPU，NMS 仍在 CPU 上完成
+        （融合了 NMS 的模型只拷回 NMS 后的少量结果）
+        
+        输入、输出的显存和主机内存都按 batch 大小分配一次后复用，主机一侧使用页锁定内存，
+        每帧不再分配/释放显存，上传和下载也不经过 CUDA 驱动的中转缓冲区。
+        开启了 CUDA Graph 时，输出绑定到固定显存之后的第一次推理捕获该 batch 大小的图，之后只重放；
+        帧尺寸变化只影响上传缓冲区，模型输入始终是 img_size，已捕获的图继续有效
+        """
+        import torch
+        import onnxruntime
+        
+        n = len(images)
+        if n not in self._gpu_bindings:
+            blob = torch.empty((n, 3, *self.img_size), device='cuda',
+                               dtype=torch.float16 if self._input_dtype == np.float16 else torch.float32)
+            binding = self.sess.io_binding()
+            binding.bind_input(self.input_name, 'cuda', 0, self._input_dtype, list(blob.shape), blob.data_ptr())
+            if self.end2end:
+                for name in self.output_names:
+                    binding.bind_output(name)  # NMS 后的输出很小，由 onnxruntime 分配在 CPU 上
+            else:
+                binding.bind_output(self.output_name, 'cuda')
+            run_options = None
+            if self._cuda_graph:
+                # 输出还由 onnxruntime 分配、地址不固定，这次推理不捕获
+                run_options = onnxruntime.RunOptions()
+                run_options.add_run_config_entry('gpu_graph_id', '-1')
+            self._gpu_bindings[n] = [blob, binding, None, run_options]
+        entry = self._gpu_bindings[n]
+        blob, binding, out_host, run_options = entry
+        with torch.cuda.stream(self._stream):
+            for i, image in enumerate(images):
+                self._preprocess_gpu(image, blob[i], i)
+        # 预处理在 torch 的 stream 上，onnxruntime 读取输入前要等它完成
+        self._stream.synchronize()
+        self.sess.run_with_iobinding(binding, run_options)
+        if self.end2end:
+            return binding.copy_outputs_to_cpu()
+        if out_host is None:
+            # 输出形状在第一次推理后才知道：之后把输出绑定到固定的显存，并分配对应的页锁定内存。
+            # 这次的结果还在 onnxruntime 分配的显存中，必须在重新绑定之前拷回，
+            # 重新绑定后 copy_outputs_to_cpu 拷贝的是新绑定（尚未写入）的 out_dev
+            result = binding.copy_outputs_to_cpu()
+            out = binding.get_outputs()[0]
+            shape = out.shape()
+            dtype = torch.float16 if out.data_type() == 'tensor(float16)' else torch.float32
+            out_dev = torch.empty(shape, device='cuda', dtype=dtype)
+            binding.bind_output(self.output_name, 'cuda', 0, np.float16 if dtype == torch.float16 else np.float32,
+                                shape, out_dev.data_ptr())
+            entry[2] = out_dev, torch.empty(shape, dtype=dtype, pin_memory=True)
+            if self._cuda_graph:
+                entry[3] = onnxruntime.RunOptions()
+                entry[3].add_run_config_entry('gpu_graph_id', str(n))
+            return result
+        out_dev, host = out_host
+        host.copy_(out_dev)
+        # host 下一次推理时会被覆盖，调用方在此之前已完成 NMS
+        return [host.numpy()]
+    
+    def _preprocess_gpu(self, image: np.ndarray, blob, slot: int = 0) -> None:
+        """
+        与 preprocess_into 相同的 letterbox 缩放填充、BGR转RGB、HWC转CHW、归一化，在显存中完成
+        双线性插值由 torch 计算，结果与 opencv 的 INTER_LINEAR 有少量舍入差异
+        
+        Args:
+            image: 输入图像 (BGR, HWC, uint8)
+            blob: (3, H, W) 的 cuda tensor
+            slot: 图像在 batch 中的位置；同一 batch 的上传是异步的，每个位置使用各自的上传缓冲区
+        """
+        import torch
+        
+        h0, w0 = image.shape[:2]
+        h, w = self.img_size
+        r = min(h / h0, w / w0)
+        new_h, new_w = int(round(h0 * r)), int(round(w0 * r))
+        top, left = int(round((h - new_h) / 2 - 0.1)), int(round((w - new_w) / 2 - 0.1))
+        bufs = self._gpu_frames.get(slot)
+        if bufs is None or bufs[0].shape != image.shape:
+            bufs = (torch.empty(image.shape, dtype=torch.uint8, pin_memory=True),
+                    torch.empty(image.shape, dtype=torch.uint8, device='cuda'))
+            self._gpu_frames[slot] = bufs
+        host, img = bufs
+        # 上一次推理结束时已同步过 stream，这里覆盖页锁定内存不会影响尚未完成的上传
+        np.copyto(host.numpy(), image)
+        img.copy_(host, non_blocking=True)
+        img = img.permute(2, 0, 1).flip(0).unsqueeze(0).float()
+        if (new_h, new_w) != (h0, w0):
+            img = torch.nn.functional.interpolate(img, size=(new_h, new_w), mode='bilinear', align_corners=False)
+        if (new_h, new_w) != (h, w):  # 宽高比与模型输入一致时没有边框
+            blob.fill_(114 / 255.)
+        blob[:, top:top + new_h, left:left + new_w] = img[0].div_(255.)
+    
+    def _det_to_list(self, det, img_shape, image_shape) -> List[List]:
+        """把一张图像的 NMS 结果还原到原图坐标，转换为 [class_name, confidence, x1, y1, x2, y2] 列表"""
+        from yolov5_utils import scale_coords
+        
+        det[:, :4] = scale_coords(img_shape, det[:, :4], image_shape).round()
+        # 坐标、置信度、类别按列一次转换为 Python 列表（顺序与 reversed(det) 相同），
+        # 不再对每个检测框逐个取值
+        det = det[::-1]
+        boxes = det[:, :4].astype(np.int64).tolist()
+        confs = det[:, 4].tolist()
+        classes = det[:, 5].astype(np.int64).tolist()
+        names, n = self.names, len(self.names)
+        return [[names[c] if c < n else f"class_{c}", round(conf, 2), x1, y1, x2, y2]
+                for (x1, y1, x2, y2), conf, c in zip(boxes, confs, classes)]
 
 
 def create_detector(weights: str, model_type: str = 'auto', **kwargs) -> BaseDetector:
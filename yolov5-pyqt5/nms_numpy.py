@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+NumPy 版 NMS 模块
+结果与 yolov5_utils.non_max_suppression（单标签、不按类别过滤、非类别无关）相同，
+直接处理 onnxruntime 输出的 numpy 数组，不再为了 NMS 转成 torch tensor
+安装了 numba 时逐框抑制的循环由 JIT 编译，否则退回 numpy 实现
+"""
+import numpy as np
+from typing import List
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+MIN_WH, MAX_WH = 2, 4096  # （像素）最小和最大盒子宽度和高度，MAX_WH 同时用作类别偏移
+MAX_NMS = 3000  # 参与 NMS 的最大框数
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _greedy_nms(boxes, iou_thres, max_det):
+        """boxes 已按置信度从高到低排序，返回保留的下标；IoU 的计算顺序与 torchvision.ops.nms 相同，全部为 float32"""
+        n = boxes.shape[0]
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        suppressed = np.zeros(n, dtype=np.bool_)
+        keep = np.empty(n, dtype=np.int64)
+        k = 0
+        for i in range(n):
+            if suppressed[i]:
+                continue
+            keep[k] = i
+            k += 1
+            if k == max_det:
+                break
+            for j in range(i + 1, n):
+                if suppressed[j]:
+                    continue
+                w = min(boxes[i, 2], boxes[j, 2]) - max(boxes[i, 0], boxes[j, 0])
+                h = min(boxes[i, 3], boxes[j, 3]) - max(boxes[i, 1], boxes[j, 1])
+                if w <= 0 or h <= 0:  # 不相交，IoU 为 0
+                    continue
+                inter = w * h
+                if inter / (areas[i] + areas[j] - inter) > iou_thres:
+                    suppressed[j] = True
+        return keep[:k]
+else:
+    def _greedy_nms(boxes, iou_thres, max_det):
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        order = np.arange(len(boxes))
+        keep = []
+        while order.size and len(keep) < max_det:
+            i, rest = order[0], order[1:]
+            keep.append(i)
+            w = np.maximum(np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0]), 0)
+            h = np.maximum(np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1]), 0)
+            inter = w * h
+            order = rest[inter / (areas[i] + areas[rest] - inter) <= iou_thres]
+        return np.array(keep, dtype=np.int64)
+
+
+def non_max_suppression(prediction: np.ndarray, conf_thres: float = 0.25, iou_thres: float = 0.45,
+                        max_det: int = 300) -> List[np.ndarray]:
+    """
+    NMS
+
+    Args:
+        prediction: 模型输出 (B, N, 5+nc) float32，框为 (中心x, 中心y, 宽, 高)
+        conf_thres: 置信度阈值
+        iou_thres: IoU 阈值
+        max_det: 每张图像最多保留的框数
+
+    Returns:
+        检测列表，每个图像的 (n,6) float32 数组 [xyxy, conf, cls]，按置信度从高到低排列
+    """
+    output = []
+    for x in prediction:
+        # 置信度和宽高约束：宽高超出范围的框置信度会变为 0，直接去掉
+        wh = x[:, 2:4]
+        x = x[(x[:, 4] > conf_thres) & ((wh >= MIN_WH) & (wh <= MAX_WH)).all(1)]
+
+        # conf = obj_conf * cls_conf，只保留最好类
+        scores = x[:, 5:] * x[:, 4:5]
+        cls = scores.argmax(1)
+        conf = scores[np.arange(len(x)), cls]
+        mask = conf > conf_thres
+        box = x[mask, :4]
+        det = np.empty((len(box), 6), dtype=np.float32)
+        det[:, 0] = box[:, 0] - box[:, 2] / 2  # 左上角 x
+        det[:, 1] = box[:, 1] - box[:, 3] / 2  # 左上角 y
+        det[:, 2] = box[:, 0] + box[:, 2] / 2  # 右下角 x
+        det[:, 3] = box[:, 1] + box[:, 3] / 2  # 右下角 y
+        det[:, 4] = conf[mask]
+        det[:, 5] = cls[mask]
+
+        # 按置信度排序，框太多时只取前 MAX_NMS 个
+        det = det[np.argsort(-det[:, 4], kind='stable')[:MAX_NMS]]
+        # 类别偏移后不同类别的框不会重叠，等价于按类别分组做 NMS
+        boxes = det[:, :4] + det[:, 5:6] * np.float32(MAX_WH)
+        output.append(det[_greedy_nms(boxes, iou_thres, max_det)])
+    return output
+
+
+def warmup():
+    """空白图像没有候选框，不会调用 NMS 内核；加载模型时调用一次，JIT 编译（或读取编译缓存）不放在第一帧"""
+    _greedy_nms(np.zeros((2, 4), dtype=np.float32), 0.45, 300)
@@ -6,11 +6,67 @@
 import os
 import json
 import csv
+import time
+import shutil
+import subprocess
+import threading
 import cv2
 import numpy as np
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 from collections import defaultdict
+from functools import lru_cache
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# 按优先级排列的 H.264 编码器及其最快的 preset：硬件编码器在前，libx264 兜底
+_H264_ENCODERS = (
+    ('h264_nvenc', ('-preset', 'p1')),
+    ('h264_qsv', ('-preset', 'veryfast')),
+    ('h264_videotoolbox', ()),
+    ('libx264', ('-preset', 'ultrafast')),
+)
+
+
+def _ffmpeg_command(output: List[str], width: int, height: int, fps: int, encoder: str,
+                    options: Tuple[str, ...]) -> List[str]:
+    """从标准输入读取原始 BGR 帧并编码为 H.264 的 ffmpeg 命令；yuv420p 要求宽高为偶数，奇数时补一行/列"""
+    return ['ffmpeg', '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', str(fps), '-i', 'pipe:',
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-c:v', encoder, *options, '-pix_fmt', 'yuv420p', *output]
+
+
+@lru_cache(maxsize=1)
+def _h264_encoder() -> Optional[Tuple[str, Tuple[str, ...]]]:
+    """
+    当前机器上可用的 H.264 编码器，没有 ffmpeg 或都不可用时返回 None；每个进程只探测一次
+    
+    ffmpeg -encoders 只说明编译时包含了该编码器，没有对应硬件时编码仍会失败，
+    所以每个候选都实际编码几帧空白图像确认
+    """
+    if shutil.which('ffmpeg') is None:
+        return None
+    try:
+        listed = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'], capture_output=True, text=True,
+                                timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    frames = np.zeros((4, 256, 256, 3), dtype=np.uint8).tobytes()
+    null = 'NUL' if os.name == 'nt' else '/dev/null'
+    for encoder, options in _H264_ENCODERS:
+        if f' {encoder} ' not in listed:
+            continue
+        cmd = _ffmpeg_command(['-f', 'null', null], 256, 256, 30, encoder, options)  # 只编码不写文件
+        try:
+            if subprocess.run(cmd, input=frames, capture_output=True, timeout=30).returncode == 0:
+                return encoder, options
+        except (OSError, subprocess.SubprocessError):
+            continue
+    return None
 
 
 class DetectionResult:
@@ -46,7 +102,15 @@ class DetectionResult:
 
 
 class PostProcessor:
-    """后处理器类"""
+    """
+    后处理器类
+    
+    检测记录按列保存在 numpy 数组中（边界框、置信度、时间戳、帧ID、类别下标），
+    不再为每个检测框创建一个 DetectionResult 对象；导出时整列转换，需要对象时再按需生成
+    """
+    
+    _TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+    _NO_FRAME_ID = -1  # frame_id 为 None 时保存的值
     
     def __init__(self, output_dir: str = './results'):
         """
@@ -56,29 +120,110 @@ class PostProcessor:
             output_dir: 输出目录
         """
         self.output_dir = output_dir
-        self.detection_history: List[DetectionResult] = []
         self.statistics: Dict[str, int] = defaultdict(int)
+        # 检测线程追加记录，主线程清空，导出线程读取，三者用同一把锁
+        self._lock = threading.Lock()
+        self._count = 0
+        self._bbox = np.empty((1024, 4), dtype=np.int32)
+        # 置信度保留 float64：导出的文字与原来的 Python float 完全相同
+        self._conf = np.empty(1024, dtype=np.float64)
+        self._ts = np.empty(1024, dtype=np.int64)  # 本地时间的秒级时间戳
+        self._frame = np.empty(1024, dtype=np.int64)
+        self._cls_idx = np.empty(1024, dtype=np.int32)
+        self._cls_names: List[str] = []  # 类别下标 → 类别名
+        self._cls_lookup: Dict[str, int] = {}
+        self.clear_count = 0  # clear_history 的调用次数，与记录数一起可判断记录是否变化
         os.makedirs(output_dir, exist_ok=True)
     
-    def add_detection(self, result_list: List[List], frame_id: Optional[int] = None):
+    def __len__(self) -> int:
+        """检测记录数"""
+        return self._count
+    
+    @property
+    def detection_history(self) -> List[DetectionResult]:
+        """全部检测记录（按需生成 DetectionResult 列表，记录多时开销较大，只需数量时用 len()）"""
+        return self.get_recent_detections(0)
+    
+    def _reserve(self, k: int):
+        """保证还能追加 k 条记录，容量不足时翻倍扩容"""
+        need = self._count + k
+        cap = len(self._conf)
+        if need <= cap:
+            return
+        while cap < need:
+            cap *= 2
+        for name in ('_bbox', '_conf', '_ts', '_frame', '_cls_idx'):
+            old = getattr(self, name)
+            new = np.empty((cap,) + old.shape[1:], dtype=old.dtype)
+            new[:self._count] = old[:self._count]
+            setattr(self, name, new)
+    
+    def _snapshot(self, last: int = 0):
+        """
+        复制出当前记录的各列，导出期间其他线程继续追加或清空不会影响结果
+        
+        Args:
+            last: 只取最后 last 条，不大于 0 时取全部
+        """
+        with self._lock:
+            n = self._count
+            i = n - last if 0 < last < n else 0
+            return (self._bbox[i:n].copy(), self._conf[i:n].copy(), self._ts[i:n].copy(),
+                    self._frame[i:n].copy(), self._cls_idx[i:n].copy(), list(self._cls_names))
+    
+    @classmethod
+    def _columns(cls, snapshot):
+        """
+        把快照转换为按列的 Python 列表：时间戳文字、帧ID（无则为 None）、类别名、置信度、x1、y1、x2、y2
+        
+        边界框按列分别 tolist，比 (N, 4) 数组整体 tolist 生成 N 个小列表快得多
+        """
+        bbox, conf, ts, frame, cls_idx, names = snapshot
+        # 同一秒内的记录时间文字相同，每个不同的秒只格式化一次
+        seconds, inverse = np.unique(ts, return_inverse=True)
+        texts = [time.strftime(cls._TIME_FORMAT, time.localtime(t)) for t in seconds.tolist()]
+        timestamps = [texts[i] for i in inverse.reshape(-1).tolist()]
+        frame_ids = [None if f == cls._NO_FRAME_ID else f for f in frame.tolist()]
+        class_names = [names[i] for i in cls_idx.tolist()]
+        return (timestamps, frame_ids, class_names, conf.tolist(), *bbox.T.tolist())
+    
+    def add_detection(self, result_list: List[List], frame_id: Optional[int] = None,
+                      counts: Optional[Dict[str, int]] = None):
         """
         添加检测结果到历史记录
         
         Args:
             result_list: 检测结果列表，格式: [class_name, confidence, x1, y1, x2, y2]
             frame_id: 帧ID
+            counts: 本帧各类别的数量，调用方已经统计过时传入，累计统计按类别累加，不再逐个检测框计数
         """
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        for result in result_list:
-            det_result = DetectionResult(
-                class_name=result[0],
-                confidence=result[1],
-                bbox=(result[2], result[3], result[4], result[5]),
-                timestamp=timestamp,
-                frame_id=frame_id
-            )
-            self.detection_history.append(det_result)
-            self.statistics[result[0]] += 1
+        if not result_list:
+            return
+        k = len(result_list)
+        timestamp = int(time.time())
+        lookup = self._cls_lookup
+        with self._lock:
+            self._reserve(k)
+            n = self._count
+            cls_idx = []
+            for result in result_list:
+                idx = lookup.get(result[0])
+                if idx is None:
+                    idx = lookup[result[0]] = len(self._cls_names)
+                    self._cls_names.append(result[0])
+                cls_idx.append(idx)
+            self._cls_idx[n:n + k] = cls_idx
+            self._bbox[n:n + k] = [result[2:6] for result in result_list]
+            self._conf[n:n + k] = [result[1] for result in result_list]
+            self._ts[n:n + k] = timestamp
+            self._frame[n:n + k] = self._NO_FRAME_ID if frame_id is None else frame_id
+            self._count = n + k
+            if counts is None:
+                for result in result_list:
+                    self.statistics[result[0]] += 1
+            else:
+                for class_name, num in counts.items():
+                    self.statistics[class_name] += num
     
     def get_statistics(self) -> Dict[str, int]:
         """获取统计信息"""
@@ -149,6 +294,27 @@ class PostProcessor:
         filepath = os.path.join(folder, filename)
         height, width = frames[0].shape[:2]
         
+        # 有可用的 H.264 编码器（优先硬件编码）时把原始帧通过管道交给 ffmpeg 编码，
+        # 否则或 ffmpeg 编码失败时使用 OpenCV 的 mp4v 软件编码
+        encoder = _h264_encoder()
+        if encoder is not None:
+            cmd = _ffmpeg_command([filepath], width, height, fps, *encoder)
+            try:
+                proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+                try:
+                    for frame in frames:
+                        if frame.shape[:2] != (height, width):
+                            frame = cv2.resize(frame, (width, height))
+                        proc.stdin.write(np.ascontiguousarray(frame).data)
+                    _, err = proc.communicate()
+                except OSError:  # ffmpeg 提前退出导致管道断开，错误信息在 stderr 中
+                    _, err = proc.communicate()
+                if proc.returncode == 0:
+                    return filepath
+                print(f'ffmpeg 编码失败，改用 OpenCV 保存视频: {err.decode(errors="replace").strip()}')
+            except OSError as e:
+                print(f'无法启动 ffmpeg，改用 OpenCV 保存视频: {e}')
+        
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
         out = cv2.VideoWriter(filepath, fourcc, fps, (width, height))
         
@@ -158,7 +324,7 @@ class PostProcessor:
         out.release()
         return filepath
     
-    def export_json(self, filename: Optional[str] = None) -> str:
+    def export_json(self, filename: Optional[str] = None) -> Tuple[str, int]:
         """
         导出检测结果为JSON格式
         
@@ -166,7 +332,7 @@ class PostProcessor:
             filename: 文件名
             
         Returns:
-            保存的文件路径
+            (保存的文件路径, 导出的记录条数)
         """
         if filename is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -174,18 +340,29 @@ class PostProcessor:
         
         filepath = os.path.join(self.output_dir, filename)
         
+        columns = self._columns(self._snapshot())
+        count = len(columns[0])
         data = {
             'statistics': self.statistics,
-            'total_detections': len(self.detection_history),
-            'detections': [det.to_dict() for det in self.detection_history]
+            'total_detections': count,
+            'detections': [{'class_name': c, 'confidence': cf, 'bbox': [x1, y1, x2, y2], 'timestamp': t,
+                            'frame_id': f}
+                           for t, f, c, cf, x1, y1, x2, y2 in zip(*columns)]
         }
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # 先在内存中序列化再一次写入；安装了 orjson 时直接生成 UTF-8 字节，
+        # 否则使用 json 的 C 编码器（不缩进、紧凑分隔符），两者内容相同
+        if ORJSON_AVAILABLE:
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(data))
+        else:
+            text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+            with open(filepath, 'w', encoding='utf-8') as f:
+                f.write(text)
         
-        return filepath
+        return filepath, count
     
-    def export_csv(self, filename: Optional[str] = None) -> str:
+    def export_csv(self, filename: Optional[str] = None) -> Tuple[str, int]:
         """
         导出检测结果为CSV格式
         
@@ -193,31 +370,25 @@ class PostProcessor:
             filename: 文件名
             
         Returns:
-            保存的文件路径
+            (保存的文件路径, 导出的记录条数)
         """
         if filename is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"detections_{timestamp}.csv"
         
         filepath = os.path.join(self.output_dir, filename)
+        columns = self._columns(self._snapshot())
+        count = len(columns[0])
         
-        with open(filepath, 'w', newline='', encoding='utf-8-sig') as f:
+        with open(filepath, 'w', newline='', encoding='utf-8-sig', buffering=1 << 20) as f:
             writer = csv.writer(f)
             writer.writerow(['时间戳', '帧ID', '类别', '置信度', 'X1', 'Y1', 'X2', 'Y2'])
-            
-            for det in self.detection_history:
-                writer.writerow([
-                    det.timestamp,
-                    det.frame_id if det.frame_id is not None else '',
-                    det.class_name,
-                    det.confidence,
-                    det.bbox[0], det.bbox[1],
-                    det.bbox[2], det.bbox[3]
-                ])
+            # 各列 zip 后一次交给 writerows，列顺序与表头一致；帧ID 为 None 时 csv 写出空字符串
+            writer.writerows(zip(*columns))
         
-        return filepath
+        return filepath, count
     
-    def export_report(self, filename: Optional[str] = None) -> str:
+    def export_report(self, filename: Optional[str] = None) -> Tuple[str, int]:
         """
         导出文本报告
         
@@ -225,7 +396,7 @@ class PostProcessor:
             filename: 文件名
             
         Returns:
-            保存的文件路径
+            (保存的文件路径, 导出的记录条数)
         """
         if filename is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -233,32 +404,43 @@ class PostProcessor:
         
         filepath = os.path.join(self.output_dir, filename)
         
+        # 各段文字先收集到列表中，最后拼接后一次写入文件
+        parts = [
+            "=" * 50 + "\n",
+            "皮带传送带锚杆检测报告\n",
+            "=" * 50 + "\n\n",
+            f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n",
+            self.get_detection_summary() + "\n",
+            "-" * 50 + "\n",
+            "详细检测记录:\n",
+            "-" * 50 + "\n",
+        ]
+        columns = self._columns(self._snapshot())
+        count = len(columns[0])
+        for i, (t, frame_id, class_name, conf, x1, y1, x2, y2) in enumerate(zip(*columns), 1):
+            frame_line = f"  帧ID: {frame_id}\n" if frame_id is not None else ""
+            parts.append(f"\n检测 #{i}:\n"
+                         f"  时间: {t}\n"
+                         f"{frame_line}"
+                         f"  类别: {class_name}\n"
+                         f"  置信度: {conf:.2f}\n"
+                         f"  位置: ({x1}, {y1}) - ({x2}, {y2})\n")
+        
         with open(filepath, 'w', encoding='utf-8') as f:
-            f.write("=" * 50 + "\n")
-            f.write("皮带传送带锚杆检测报告\n")
-            f.write("=" * 50 + "\n\n")
-            f.write(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            f.write(self.get_detection_summary() + "\n")
-            f.write("-" * 50 + "\n")
-            f.write("详细检测记录:\n")
-            f.write("-" * 50 + "\n")
-            
-            for i, det in enumerate(self.detection_history, 1):
-                f.write(f"\n检测 #{i}:\n")
-                f.write(f"  时间: {det.timestamp}\n")
-                if det.frame_id is not None:
-                    f.write(f"  帧ID: {det.frame_id}\n")
-                f.write(f"  类别: {det.class_name}\n")
-                f.write(f"  置信度: {det.confidence:.2f}\n")
-                f.write(f"  位置: ({det.bbox[0]}, {det.bbox[1]}) - ({det.bbox[2]}, {det.bbox[3]})\n")
+            f.write("".join(parts))
         
-        return filepath
+        return filepath, count
     
     def clear_history(self):
         """清空历史记录"""
-        self.detection_history.clear()
-        self.statistics.clear()
+        with self._lock:
+            self._count = 0
+            self._cls_names.clear()
+            self._cls_lookup.clear()
+            self.statistics.clear()
+            self.clear_count += 1
     
     def get_recent_detections(self, count: int = 10) -> List[DetectionResult]:
-        """获取最近的检测结果"""
-        return self.detection_history[-count:] if count > 0 else self.detection_history
+        """获取最近的检测结果，count 不大于 0 时返回全部"""
+        return [DetectionResult(class_name=c, confidence=cf, bbox=(x1, y1, x2, y2), timestamp=t, frame_id=f)
+                for t, f, c, cf, x1, y1, x2, y2 in zip(*self._columns(self._snapshot(count)))]
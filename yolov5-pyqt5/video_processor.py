@@ -8,6 +8,19 @@ import numpy as np
 from typing import Tuple, Optional, Callable
 
 
+def _cuda_available() -> bool:
+    """
+    OpenCV 是否带 CUDA 模块且有可用的 GPU；pip 安装的 opencv-python 不含 CUDA，返回 False
+    自行编译的 OpenCV 可能缺少 cudawarping / cudaarithm 等模块，用到的函数也要存在
+    """
+    try:
+        if cv2.cuda.getCudaEnabledDeviceCount() <= 0:
+            return False
+    except (AttributeError, cv2.error):
+        return False
+    return all(hasattr(cv2.cuda, f) for f in ('resize', 'cvtColor', 'createLookUpTable'))
+
+
 class VideoProcessor:
     """视频处理器类"""
     
@@ -35,6 +48,15 @@ class VideoProcessor:
         self.brightness = brightness
         self.contrast = contrast
         self.saturation = saturation
+        # 增强用的查找表，参数变化后在 _enhance_image 中重新生成
+        self._lut_params = None
+        self._bc_lut = None  # 亮度+对比度合并后的 256 项查找表
+        self._s_lut = None  # HSV 图像的 (256, 1, 3) 查找表，只改变 S 通道
+        # OpenCV 带 CUDA 时缩放和增强在 GPU 上完成（见 _process_frame_gpu），设为 False 可强制使用 CPU
+        self.use_gpu = _cuda_available()
+        self._gpu_src = None  # 每帧上传复用的 GpuMat
+        self._gpu_bufs = None  # 中间结果轮流写入的两个 GpuMat
+        self._gpu_luts = None  # 与 _bc_lut、_s_lut 对应的 cv2.cuda LookUpTable
         
     def process_frame(self, frame: np.ndarray) -> np.ndarray:
         """
@@ -46,6 +68,9 @@ class VideoProcessor:
         Returns:
             处理后的帧
         """
+        if self.use_gpu and (self.target_size or self.enable_enhancement):
+            return self._process_frame_gpu(frame)
+        
         # 调整分辨率
         if self.target_size:
             frame = cv2.resize(frame, self.target_size, interpolation=cv2.INTER_LINEAR)
@@ -66,25 +91,75 @@ class VideoProcessor:
         Returns:
             增强后的图像
         """
-        # 亮度调整
-        if self.brightness != 1.0:
-            frame = cv2.convertScaleAbs(frame, alpha=1.0, beta=int((self.brightness - 1.0) * 50))
+        self._update_luts()
         
-        # 对比度调整
-        if self.contrast != 1.0:
+        # 亮度、对比度都要调整时合并为一次查表；只调整一项时 convertScaleAbs 一次遍历更快
+        if self.brightness != 1.0 and self.contrast != 1.0:
+            frame = cv2.LUT(frame, self._bc_lut)
+        elif self.brightness != 1.0:
+            frame = cv2.convertScaleAbs(frame, alpha=1.0, beta=int((self.brightness - 1.0) * 50))
+        elif self.contrast != 1.0:
             frame = cv2.convertScaleAbs(frame, alpha=self.contrast, beta=0)
         
-        # 饱和度调整（转换到HSV空间）
+        # 饱和度调整（转换到HSV空间）：S 通道查表，不再整幅图转成 float32 计算
         if self.saturation != 1.0:
             hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-            hsv = hsv.astype(np.float32)
-            hsv[:, :, 1] = hsv[:, :, 1] * self.saturation
-            hsv[:, :, 1] = np.clip(hsv[:, :, 1], 0, 255)
-            hsv = hsv.astype(np.uint8)
+            cv2.LUT(hsv, self._s_lut, dst=hsv)
             frame = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
         
         return frame
     
+    def _process_frame_gpu(self, frame: np.ndarray) -> np.ndarray:
+        """
+        process_frame 的 GPU 版本：帧只上传、下载各一次，缩放、亮度对比度、饱和度都在显存中完成
+        
+        亮度/对比度和饱和度使用与 CPU 相同的查找表；缩放和颜色空间转换由 CUDA 实现，
+        与 CPU 版本可能有 ±1 的舍入差异
+        """
+        if self._gpu_src is None:
+            self._gpu_src = cv2.cuda_GpuMat()
+            self._gpu_bufs = [cv2.cuda_GpuMat(), cv2.cuda_GpuMat()]
+        self._gpu_src.upload(frame)
+        gpu, bufs, i = self._gpu_src, self._gpu_bufs, 0
+        # 每一步从上一步的结果写入另一个缓冲区，尺寸不变时 GpuMat 不会重新分配显存
+        if self.target_size:
+            gpu = cv2.cuda.resize(gpu, self.target_size, bufs[i], interpolation=cv2.INTER_LINEAR)
+            i ^= 1
+        if self.enable_enhancement:
+            self._update_luts()
+            bc_lut, s_lut = self._gpu_luts
+            if self.brightness != 1.0 or self.contrast != 1.0:
+                gpu = bc_lut.transform(gpu, bufs[i])
+                i ^= 1
+            if self.saturation != 1.0:
+                gpu = cv2.cuda.cvtColor(gpu, cv2.COLOR_BGR2HSV, bufs[i])
+                i ^= 1
+                gpu = s_lut.transform(gpu, bufs[i])
+                i ^= 1
+                gpu = cv2.cuda.cvtColor(gpu, cv2.COLOR_HSV2BGR, bufs[i])
+                i ^= 1
+        # download 每次返回新的数组，调用方可以一直持有之前的帧
+        return gpu.download()
+    
+    def _update_luts(self):
+        """增强参数变化后重新生成查找表"""
+        params = (self.brightness, self.contrast, self.saturation)
+        if params != self._lut_params:
+            self._build_luts()
+            self._lut_params = params
+    
+    def _build_luts(self):
+        """用与逐像素计算相同的运算处理 0~255，生成的查找表与原来的计算结果完全一致"""
+        values = np.arange(256, dtype=np.uint8).reshape(1, 256)
+        bc = cv2.convertScaleAbs(values, alpha=1.0, beta=int((self.brightness - 1.0) * 50))
+        self._bc_lut = cv2.convertScaleAbs(bc, alpha=self.contrast, beta=0)
+        # 饱和度：float32 相乘后截断到 0~255（与 astype(np.uint8) 相同，向下取整）
+        s = np.clip(values.astype(np.float32) * self.saturation, 0, 255).astype(np.uint8)
+        self._s_lut = np.ascontiguousarray(np.stack([values, s, values], axis=-1).reshape(256, 1, 3))
+        if self.use_gpu:
+            self._gpu_luts = (cv2.cuda.createLookUpTable(self._bc_lut),
+                              cv2.cuda.createLookUpTable(self._s_lut.reshape(1, 256, 3)))
+    
     def get_video_info(self, video_path: str) -> dict:
         """
         获取视频信息
@@ -65,6 +65,25 @@ def letterbox(im, new_shape=(640, 640), color=(114, 114, 114), auto=True, scaleF
     # print(f'填充后的图片尺寸:{im.shape}')
     return im, ratio, (dw, dh)
 
+
+def letterbox_into(im, out, color=(114, 114, 114)):
+    # letterbox(auto=False) 的原地版本，缩放结果直接写入预先分配好的 out，目标尺寸取 out 的尺寸
+    shape = im.shape[:2]  # 当前形状[高度，宽度]
+    new_shape = out.shape[:2]
+    r = min(new_shape[0] / shape[0], new_shape[1] / shape[1])
+    new_unpad = int(round(shape[1] * r)), int(round(shape[0] * r))  # 宽高
+    dw, dh = (new_shape[1] - new_unpad[0]) / 2, (new_shape[0] - new_unpad[1]) / 2
+    top, left = int(round(dh - 0.1)), int(round(dw - 0.1))
+    bottom, right = top + new_unpad[1], left + new_unpad[0]
+    # 只填充四周的边框，中间区域由缩放结果覆盖
+    out[:top], out[bottom:] = color, color
+    out[top:bottom, :left], out[top:bottom, right:] = color, color
+    if shape[::-1] != new_unpad:
+        cv2.resize(im, new_unpad, dst=out[top:bottom, left:right], interpolation=cv2.INTER_LINEAR)
+    else:
+        out[top:bottom, left:right] = im
+    return (r, r), (dw, dh)
+
 '''------后处理------'''
 # NMS
 def non_max_suppression(prediction, conf_thres=0.25, iou_thres=0.45, classes=None, agnostic=False, multi_label=False,
@@ -131,6 +150,51 @@ def non_max_suppression(prediction, conf_thres=0.25, iou_thres=0.45, classes=Non
     return output
 
 
+# Fast NMS
+def fast_nms(prediction, conf_thres=0.25, iou_thres=0.45, classes=None, agnostic=False, top_k=200, max_det=300):
+    """
+    Fast NMS（YOLACT）：对按置信度排序的候选框计算两两 IoU 矩阵，取上三角后按列求最大值，
+    一次性得到保留的框。全部是张量运算，没有逐框的串行抑制，可以直接在 GPU 上执行。
+    与传统 NMS 的区别是已被抑制的框仍会抑制其他框，精度损失很小。
+
+    返回：检测列表，每个图像的 (n,6) tensor [xyxy, conf, cls]   # [左上角坐标xy右下角坐标xy,置信度,类别]
+    """
+
+    xc = prediction[..., 4] > conf_thres  # 候选框
+    min_wh, max_wh = 2, 4096  # （像素）最小和最大盒子宽度和高度
+
+    output = [torch.zeros((0, 6), device=prediction.device)] * prediction.shape[0]
+    for xi, x in enumerate(prediction):  # 图像索引xi，图像推断x
+        # 应用约束
+        x[((x[..., 2:4] < min_wh) | (x[..., 2:4] > max_wh)).any(1), 4] = 0  # 宽高
+        x = x[xc[xi]]  # 置信度
+        if not x.shape[0]:
+            continue
+
+        # conf = obj_conf * cls_conf，只保留最好类
+        x[:, 5:] *= x[:, 4:5]
+        box = xywh2xyxy(x[:, :4])
+        conf, j = x[:, 5:].max(1, keepdim=True)
+        x = torch.cat((box, conf, j.float()), 1)[conf.view(-1) > conf_thres]
+
+        # 按类别过滤
+        if classes is not None:
+            x = x[(x[:, 5:6] == torch.tensor(classes, device=x.device)).any(1)]
+        if not x.shape[0]:
+            continue
+
+        # 按置信度取前 top_k 个框
+        x = x[x[:, 4].argsort(descending=True)[:top_k]]
+        # 类别偏移后不同类别的框不会重叠，等价于按类别分组计算
+        boxes = x[:, :4] + x[:, 5:6] * (0 if agnostic else max_wh)
+        # 上三角 IoU 矩阵：第 j 列为第 j 个框与所有置信度更高的框的 IoU
+        iou = torchvision.ops.box_iou(boxes, boxes).triu_(diagonal=1)
+        keep = iou.max(dim=0).values < iou_thres
+        output[xi] = x[keep][:max_det]
+
+    return output
+
+
 def clip_coords(boxes, shape):
     # 将边界 xyxy 框裁剪为图像形状（高度、宽度）
     if isinstance(boxes, torch.Tensor):  # tensor类型